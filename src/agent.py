@@ -1,5 +1,5 @@
 """
-file for agent class
+file for agent class (view of one row of an agent state)
 tasks:
 1. checking obstacle collision bounds
 2. updating position based on feedforward neural network
@@ -7,94 +7,123 @@ tasks:
 4. displaying agent to window
 """
 import pygame
+import numpy as np
 from settings import *
+from config import Config
 from environment import Environment
 from genome import Genome
 from neural_network import NeuralNetwork
-import math
+from agent_state import AgentState, END_REASONS
+from sprite_cache import sprite_cache
 
 
 class Agent():
-    def __init__(self, genome:Genome):
+    def __init__(self, genome:Genome, index=0, state:AgentState=None, config:Config=None):
         # initialize attributes
         self.genome = genome
-        self.network = NeuralNetwork(genome.layer_sizes, genome.weights)
+        self.config = config if config is not None else genome.config
+        self._network = None # compiled on first use (population agents use the batched network)
 
-        self.position = pygame.Vector2(AGENT_START)
-        self.angle = 90
-        self.distance = 0
-        self.fitness = 0
-        self.alive = True
+        # agent data lives in a row of a (possibly shared) agent state
+        self.state = state if state is not None else AgentState(1, self.config)
+        self.index = index # row of agent in state and in population's batched network
+        self.indices = np.array([index]) # index array for agent state methods
 
-        # template surface to copy
-        self.original_surface = pygame.Surface((AGENT_WIDTH, AGENT_HEIGHT), pygame.SRCALPHA)
-        self.original_surface.fill(AGENT_ALIVE_COLOR)
 
-        # initial surface
-        self.surface = pygame.transform.rotate(self.original_surface, -self.angle)
-        self.rect = self.surface.get_rect(center=(self.position.x, self.position.y))
-        self.mask = pygame.mask.from_surface(self.surface)
+    # attributes read from agent state
+    @property
+    def position(self):
+        x, y = self.state.positions[self.index]
+        return pygame.Vector2(x, y)
+
+    @property
+    def angle(self):
+        return float(self.state.angles[self.index])
+
+    @property
+    def speed(self):
+        return float(self.state.speeds[self.index])
+
+    @property
+    def angular_velocity(self):
+        return float(self.state.angular_velocities[self.index])
+
+    @property
+    def distance(self):
+        return float(self.state.distances[self.index])
+
+    @property
+    def fitness(self):
+        return float(self.state.fitnesses[self.index])
+
+    @property
+    def alive(self):
+        return bool(self.state.alive[self.index])
+
+    @property
+    def end_reason(self):
+        return END_REASONS[self.state.end_reasons[self.index]]
+
+    @property
+    def sensor_points(self):
+        return self.state.sensor_points[self.index]
+
+    @property
+    def network(self):
+        if self._network is None:
+            self._network = NeuralNetwork(self.genome.layer_sizes, self.genome.weights, self.config)
+        return self._network
+
+
+    # surface, rect, and mask are shared between agents
+    @property
+    def surface(self):
+        return sprite_cache.get(self.angle, self.alive)[0]
+
+    @property
+    def mask(self):
+        return sprite_cache.get(self.angle, self.alive)[1]
+
+    @property
+    def rect(self):
+        position = self.state.positions[self.index]
+        return self.surface.get_rect(center=(position[0], position[1]))
 
 
     def update(self, env:Environment, screen, iterations):
         # check if alive
         if not self.alive:
             return
-        
+
         # retrieve genome response
         sensor_readings = self.sense_environment(env, screen)
-        self.evaluate_data(sensor_readings) # scale NN outputs to car movement parameters
+        speed_output, ang_vel_output = self.network.feedforward(sensor_readings) # get NN outputs
+        self.evaluate_data(speed_output, ang_vel_output) # scale NN outputs to car movement parameters
 
-        # update speed (pixels/s) and angle (degrees)
-        self.angle += self.angular_velocity
+        self.move(env, iterations)
 
-        # update position
-        self.position.x += math.cos(math.radians(self.angle)) * self.speed
-        self.position.y += math.sin(math.radians(self.angle)) * self.speed
 
-        self.check_bounds(env) # check if alive
+    def move(self, env:Environment, iterations):
+        previous_positions, previous_angles = self.state.positions[self.indices], self.state.angles[self.indices]
+        self.state.move(self.indices) # update angle and position
+        self.state.check_bounds(env, self.indices, previous_positions, previous_angles) # check if alive (swept from previous pose)
         self.calculate_fitness(iterations)
 
-        # determine surface, rect, and mask
-        self.surface = pygame.transform.rotate(self.original_surface, -self.angle)
-        self.rect = self.surface.get_rect(center=(self.position.x, self.position.y))
-        self.mask = pygame.mask.from_surface(self.surface)
 
-
-    def evaluate_data(self, sensor_readings):
-        speed_output, ang_vel_output = self.network.feedforward(sensor_readings) # get NN outputs
-
-        self.speed = (speed_output + 1) / 2 * (MAX_SPEED - MIN_SPEED) + MIN_SPEED # map [-1,1] to [min_speed,max_speed]
-        self.angular_velocity = ang_vel_output * MAX_ANG_VEL
+    def evaluate_data(self, speed_output, ang_vel_output):
+        self.state.evaluate_data(self.indices, [speed_output, ang_vel_output])
 
 
     def check_bounds(self, env:Environment):
-        # determine if car is within window
-        if self.position.x < 0 or self.position.x > WORLD_WIDTH or self.position.y < 0 or self.position.y > WORLD_HEIGHT:
-            self.alive = False
-            self.original_surface.fill(AGENT_DEAD_COLOR)
-
-        # determine if car collides with track
-        elif not env.is_on_track(self.surface, self.rect):
-            self.alive = False
-            self.original_surface.fill(AGENT_DEAD_COLOR)
+        self.state.check_bounds(env, self.indices)
 
 
     def sense_environment(self, env:Environment, screen):
-        distances, self.sensor_points = env.cast_all_rays(self.position, self.angle)
-
-        return distances
+        return self.state.sense_environment(env, self.indices)[0]
 
 
     def calculate_fitness(self, iterations):
-        self.distance += self.speed # update distance traveled
-        avg_speed = self.distance / iterations
-        
-        # normalize speed and distance to fraction of 1.0
-        norm_distance = self.distance / TRACK_LENGTH
-        norm_avg_speed = avg_speed / MAX_SPEED
-        
-        self.fitness = norm_distance * DIST_WEIGHT + norm_avg_speed * AVG_SPEED_WEIGHT # calculate fitness
+        self.state.calculate_fitness(self.indices, iterations)
 
 
     def draw(self, screen:pygame.Surface, camera_offset):
@@ -104,5 +133,5 @@ class Agent():
 
         # draw sensor points
         for point in self.sensor_points:
-            offset_point = point - camera_offset
-            pygame.draw.circle(screen, SENSOR_COLOR, offset_point, 5)
\ No newline at end of file
+            offset_point = (point[0] - camera_offset.x, point[1] - camera_offset.y)
+            pygame.draw.circle(screen, SENSOR_COLOR, offset_point, 5)
@@ -0,0 +1,212 @@
+"""
+file for agent state class (array-backed state of a group of agents)
+tasks:
+1. storing position, angle, speed, distance, fitness, ticks and alive flags as contiguous arrays
+2. sensing and feedforward of all live agents at once
+3. vectorized movement, collision bounds and fitness updates
+4. ending episodes early (tick budget, stalled agents, agents that can't reach the top)
+5. fixed timestep (TIMESTEP frames per tick) with swept collision between previous and new pose
+6. copying rows into a smaller state, so episodes of some agents can be continued (successive halving)
+"""
+import math
+import numpy as np
+from settings import *
+from config import Config
+from profiler import profiler
+
+ROW_ARRAYS = ("positions", "angles", "speeds", "angular_velocities", "distances", "fitnesses", "alive", "ticks", "end_reasons",
+              "step_fractions", "sensor_points", "sensor_distances") # arrays with one row per agent
+END_REASONS = ("running", "out_of_bounds", "collision", "tick_budget", "stalled", "cannot_beat_best") # why agents ended their episode
+CAR_RADIUS = math.hypot(AGENT_WIDTH / 2, AGENT_HEIGHT / 2) # distance from car center to corners
+
+
+class AgentState():
+    def __init__(self, num_agents, config:Config=None):
+        self.num_agents = num_agents
+        self.config = config if config is not None else Config()
+        config = self.config
+
+        self.positions = np.tile(np.array(config.AGENT_START, dtype=np.float64), (num_agents, 1)) # (num_agents, 2)
+        self.angles = np.full(num_agents, 90.0) # degrees
+        self.speeds = np.zeros(num_agents)
+        self.angular_velocities = np.zeros(num_agents)
+        self.distances = np.zeros(num_agents)
+        self.fitnesses = np.zeros(num_agents)
+        self.alive = np.ones(num_agents, dtype=bool)
+        self.ticks = np.zeros(num_agents, dtype=np.int64) # ticks each agent was alive for
+        self.end_reasons = np.zeros(num_agents, dtype=np.int8) # index into END_REASONS
+        self.step_fractions = np.ones(num_agents) # part of last tick's motion done before crashing
+        self.stall_window = max(1, round(config.STALL_WINDOW / config.TIMESTEP)) if config.STALL_WINDOW else 0 # stall window in ticks
+        self.stall_positions = np.tile(self.positions, (self.stall_window, 1, 1)) if config.STALL_WINDOW else None # positions of last stall_window ticks
+        self.sensor_points = np.tile(self.positions[:, None, :], (1, len(config.SENSOR_ANGLES), 1)) # (num_agents, num_sensors, 2)
+        self.sensor_distances = np.ones((num_agents, len(config.SENSOR_ANGLES))) # last sensor readings (fraction of MAX_SENSOR_DIST)
+
+
+    def take(self, indices):
+        # new state with the given rows, in that order (episodes continue where they stopped)
+        state = AgentState(len(indices), self.config)
+        for name in ROW_ARRAYS:
+            setattr(state, name, getattr(self, name)[indices])
+        if self.stall_positions is not None:
+            state.stall_positions = self.stall_positions[:, indices]
+        return state
+
+
+    def step(self, env, network, iterations):
+        # advance every live agent by one tick
+        live = np.nonzero(self.alive)[0]
+        if not len(live):
+            return
+        self.ticks[live] += 1
+
+        if profiler.enabled:
+            start = profiler.lap()
+        sensor_readings = self.sense_environment(env, live)
+        if profiler.enabled:
+            start = profiler.lap("sensing", start)
+        outputs = network.feedforward(sensor_readings, live) # evaluate all live agents at once
+        if profiler.enabled:
+            start = profiler.lap("inference", start)
+        self.evaluate_data(live, outputs)
+        previous_positions, previous_angles = self.positions[live], self.angles[live] # copies (fancy indexing)
+        self.move(live)
+        if profiler.enabled:
+            start = profiler.lap("motion", start)
+        self.check_bounds(env, live, previous_positions, previous_angles)
+        if profiler.enabled:
+            start = profiler.lap("collision", start)
+        self.calculate_fitness(live, iterations)
+        self.check_termination(live[self.alive[live]], iterations)
+        if profiler.enabled:
+            profiler.lap("motion", start) # fitness bookkeeping counts as motion
+
+
+    def sense_environment(self, env, indices):
+        distances, self.sensor_points[indices] = env.cast_all_rays(self.positions[indices], self.angles[indices])
+        self.sensor_distances[indices] = distances
+        return distances
+
+
+    def evaluate_data(self, indices, outputs):
+        config = self.config
+        outputs = np.asarray(outputs, dtype=np.float64).reshape(-1, 2)
+        self.speeds[indices] = (outputs[:, 0] + 1) / 2 * (config.MAX_SPEED - config.MIN_SPEED) + config.MIN_SPEED # map [-1,1] to [min_speed,max_speed]
+        self.angular_velocities[indices] = outputs[:, 1] * config.MAX_ANG_VEL
+
+
+    def move(self, indices):
+        # update angle (degrees) then position, speeds are per frame and a tick lasts TIMESTEP frames
+        timestep = self.config.TIMESTEP
+        self.angles[indices] += self.angular_velocities[indices] * timestep
+
+        radians = np.radians(self.angles[indices])
+        self.positions[indices, 0] += np.cos(radians) * self.speeds[indices] * timestep
+        self.positions[indices, 1] += np.sin(radians) * self.speeds[indices] * timestep
+
+
+    def check_bounds(self, env, indices, previous_positions=None, previous_angles=None):
+        # swept collision: poses between previous and new pose are checked at most SWEEP_SPACING pixels apart (no previous pose = new pose only)
+        positions = self.positions[indices]
+        angles = self.angles[indices]
+        self.step_fractions[indices] = 1.0
+
+        substeps = None
+        if previous_positions is not None:
+            turn = np.radians(np.abs(angles - previous_angles)) * CAR_RADIUS # distance moved by corners when turning
+            shift = np.hypot(positions[:, 0] - previous_positions[:, 0], positions[:, 1] - previous_positions[:, 1])
+            substeps = np.ceil((shift + turn) / self.config.SWEEP_SPACING).astype(np.int64)
+
+        if substeps is None or substeps.max() <= 1: # no pose between previous and new one needs a check
+            in_world, on_track = self.test_poses(env, positions, angles)
+            self.alive[indices] = in_world & on_track
+            self.end_reasons[indices[~in_world]] = END_REASONS.index("out_of_bounds")
+            self.end_reasons[indices[in_world & ~on_track]] = END_REASONS.index("collision")
+            return
+
+        substeps = np.maximum(substeps, 1)
+        pending = np.arange(len(indices)) # agents without a crash so far
+        for substep in range(1, substeps.max() + 1):
+            pending = pending[substeps[pending] >= substep]
+            remaining = 1 - substep / substeps[pending] # interpolate back from new pose, so last substep is exactly the new pose
+            sub_positions = positions[pending] - (positions[pending] - previous_positions[pending]) * remaining[:, None]
+            sub_angles = angles[pending] - (angles[pending] - previous_angles[pending]) * remaining
+
+            in_world, on_track = self.test_poses(env, sub_positions, sub_angles)
+            crashed = ~(in_world & on_track)
+            if crashed.any():
+                ended = indices[pending[crashed]]
+                self.alive[ended] = False
+                self.end_reasons[indices[pending[~in_world]]] = END_REASONS.index("out_of_bounds")
+                self.end_reasons[indices[pending[in_world & ~on_track]]] = END_REASONS.index("collision")
+                self.positions[ended] = sub_positions[crashed] # car stops where it crashed
+                self.angles[ended] = sub_angles[crashed]
+                self.step_fractions[ended] = 1 - remaining[crashed]
+                pending = pending[~crashed]
+
+
+    def test_poses(self, env, positions, angles):
+        # determine if cars are within window
+        in_world = (positions[:, 0] >= 0) & (positions[:, 0] <= WORLD_WIDTH) & (positions[:, 1] >= 0) & (positions[:, 1] <= WORLD_HEIGHT)
+
+        # determine if cars collide with track
+        if self.config.USE_DISTANCE_FIELD:
+            on_track = env.is_on_track_fast(positions, angles)
+        else:
+            on_track = np.ones(len(positions), dtype=bool)
+            on_track[in_world] = env.is_on_track_masks(positions[in_world], angles[in_world])
+
+        return in_world, on_track
+
+
+    def calculate_fitness(self, indices, iterations):
+        self.distances[indices] += self.speeds[indices] * self.config.TIMESTEP * self.step_fractions[indices] # update distance traveled
+        self.fitnesses[indices] = self.fitness_of(self.distances[indices], iterations * self.config.TIMESTEP) # calculate fitness
+
+
+    def fitness_of(self, distances, frames):
+        # distance and average speed per frame over frames, so fitness doesn't depend on TIMESTEP
+        config = self.config
+        avg_speeds = distances / frames
+
+        # normalize speed and distance to fraction of 1.0
+        norm_distances = distances / config.TRACK_LENGTH
+        norm_avg_speeds = avg_speeds / config.MAX_SPEED
+
+        return norm_distances * config.DIST_WEIGHT + norm_avg_speeds * config.AVG_SPEED_WEIGHT
+
+
+    def check_termination(self, indices, iterations):
+        # indices: agents still alive after this tick's bounds check
+        # budgets are in frames, a tick lasts TIMESTEP frames
+        config = self.config
+        elapsed = iterations * config.TIMESTEP
+
+        # hard tick budget
+        if config.MAX_EPISODE_TICKS and elapsed >= config.MAX_EPISODE_TICKS:
+            self.end(indices, "tick_budget")
+            return
+
+        # no progress: moved less than STALL_MIN_PROGRESS (straight line) during the last STALL_WINDOW frames
+        if config.STALL_WINDOW:
+            slot = iterations % self.stall_window
+            if iterations >= self.stall_window:
+                progress = np.linalg.norm(self.positions[indices] - self.stall_positions[slot, indices], axis=1)
+                stalled = indices[progress < config.STALL_MIN_PROGRESS]
+                self.end(stalled, "stalled")
+            self.stall_positions[slot, indices] = self.positions[indices]
+
+        # agents that can't end up among the NUM_PARENTS fittest, even at max speed for the rest of the tick budget
+        if config.BEST_CUTOFF and config.MAX_EPISODE_TICKS:
+            finished = self.fitnesses[~self.alive]
+            if len(finished) >= config.NUM_PARENTS:
+                threshold = np.partition(finished, -config.NUM_PARENTS)[-config.NUM_PARENTS] # final fitness of NUM_PARENTS-th best finished agent
+                indices = indices[self.alive[indices]]
+                max_distances = self.distances[indices] + (config.MAX_EPISODE_TICKS - elapsed) * config.MAX_SPEED
+                max_fitnesses = max_distances / config.TRACK_LENGTH * config.DIST_WEIGHT + config.AVG_SPEED_WEIGHT # average speed can't exceed MAX_SPEED
+                self.end(indices[max_fitnesses < threshold], "cannot_beat_best")
+
+
+    def end(self, indices, reason):
+        # end episode of agents for a reason other than a crash
+        self.alive[indices] = False
+        self.end_reasons[indices] = END_REASONS.index(reason)
@@ -0,0 +1,125 @@
+"""
+file for hall of fame archive (sqlite)
+tasks:
+1. storing champion genomes keyed by track file, network topology and fitness (one row per genome hash and track)
+2. adding the fittest genomes of every generation while training (trainer observer)
+3. returning the top genomes of a topology for warm starting new runs (same track first)
+4. listing archived champions
+"""
+import argparse
+import sqlite3
+import time
+import numpy as np
+from settings import *
+from config import Config
+from trainer import Observer
+from genome import genome_keys
+from neural_network import network_layer_sizes
+
+
+def topology_name(config:Config=None):
+    # genomes can only be reused by networks with the same name
+    config = config if config is not None else Config()
+    biases = " biases" if config.USE_BIASES else ""
+    return f"{'-'.join(str(size) for size in network_layer_sizes(config))}{biases} {config.HIDDEN_ACTIVATION}/{config.OUTPUT_ACTIVATION}"
+
+
+class GenomeArchive():
+    def __init__(self, path=ARCHIVE_FILE):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS genomes (
+                hash BLOB NOT NULL,
+                track TEXT NOT NULL,
+                topology TEXT NOT NULL,
+                fitness REAL NOT NULL,
+                distance REAL NOT NULL,
+                generation INTEGER NOT NULL,
+                weights BLOB NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (hash, track)
+            );
+            CREATE INDEX IF NOT EXISTS genomes_by_fitness ON genomes (topology, track, fitness DESC);
+        """)
+
+
+    def add(self, weights, fitnesses, distances, generation, track, topology=None):
+        # identical genomes are stored once per track, keeping their best result
+        topology = topology or topology_name()
+        weights = np.ascontiguousarray(weights, dtype=np.float64)
+        now = time.time()
+        rows = [(key, track, topology, float(fitness), float(distance), int(generation), row.tobytes(), now)
+                for key, row, fitness, distance in zip(genome_keys(weights), weights, fitnesses, distances)]
+        with self.connection: # one transaction
+            self.connection.executemany("""
+                INSERT INTO genomes VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (hash, track) DO UPDATE SET fitness = excluded.fitness, distance = excluded.distance, generation = excluded.generation
+                WHERE excluded.fitness > genomes.fitness
+            """, rows)
+
+
+    def top(self, k, track=None, topology=None):
+        # (k, num_weights) fittest genomes of topology, genomes of track first, then other tracks
+        topology = topology or topology_name()
+        rows = self.connection.execute("""
+            SELECT hash, weights FROM genomes WHERE topology = ?
+            ORDER BY track = ? DESC, fitness DESC
+        """, (topology, track))
+
+        found = {}
+        for key, weights in rows:
+            if len(found) == k:
+                break
+            found.setdefault(key, np.frombuffer(weights, dtype=np.float64)) # same genome archived for several tracks
+        if not found: # nothing archived for topology
+            return np.zeros((0, 0))
+        return np.array(list(found.values()), dtype=np.float64)
+
+
+    def champions(self, k, track=None):
+        # (track, topology, fitness, distance, generation) of the fittest archived genomes
+        where, args = ("WHERE track = ?", (track,)) if track is not None else ("", ())
+        return self.connection.execute(f"""
+            SELECT track, topology, fitness, distance, generation FROM genomes {where}
+            ORDER BY fitness DESC LIMIT ?
+        """, (*args, k)).fetchall()
+
+
+    def close(self):
+        self.connection.close()
+
+
+class ArchiveWriter(Observer):
+    # adds the fittest genomes of every finished generation to an archive
+    def __init__(self, archive:GenomeArchive, top_k=ARCHIVE_TOP_K):
+        self.archive = archive
+        self.top_k = top_k
+
+
+    def on_generation(self, trainer):
+        pop = trainer.pop
+        order = np.argsort(-pop.state.fitnesses, kind="stable")[:self.top_k]
+        self.archive.add(pop.weights[order], pop.state.fitnesses[order], pop.state.distances[order], pop.generation, trainer.env.filename,
+                         topology_name(pop.config))
+
+
+    def on_finish(self, trainer):
+        self.archive.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="list champion genomes of the hall of fame archive")
+    parser.add_argument("--archive", default=ARCHIVE_FILE, help="archive file")
+    parser.add_argument("--track", default=None, help="only genomes of this track file")
+    parser.add_argument("--top", type=int, default=10, help="number of genomes listed")
+    args = parser.parse_args()
+
+    archive = GenomeArchive(args.archive)
+    for track, topology, fitness, distance, generation in archive.champions(args.top, args.track):
+        print(f"{fitness:8.3f}  distance {distance:6.0f}  generation {generation:4d}  {topology}  {track}")
+    archive.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""
+file for atomic file writes
+tasks:
+1. writing a file under a temporary name next to it and moving it into place when done
+   (readers and interrupted writes never see a partial file, a failed write leaves the old file as it was)
+"""
+import os
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_write(path, mode="wb", **kwargs):
+    # yields the open temporary file (named by process, so processes writing the same file don't share it)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, mode, **kwargs) as file:
+            yield file
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
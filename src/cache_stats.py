@@ -0,0 +1,17 @@
+"""
+file for cache stats mixin
+tasks:
+1. reporting hits, misses, size and hit rate of a cache (sprite cache, fitness cache)
+"""
+
+
+class CacheStats():
+    # caches count self.hits and self.misses and define __len__ (number of stored entries)
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self),
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
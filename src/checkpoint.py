@@ -0,0 +1,71 @@
+"""
+file for checkpoints (resuming interrupted training)
+tasks:
+1. snapshotting training state between generations (genome weights, generation, best so far, fitness cache, random state)
+2. writing snapshots atomically as one npz file every CHECKPOINT_INTERVAL generations and when training ends
+3. restoring a trainer from a checkpoint, so training continues bit-for-bit
+"""
+import json
+import numpy as np
+from settings import *
+from trainer import Observer
+import genome
+from atomic_file import atomic_write
+
+CHECKPOINT_VERSION = 1 # increase when arrays change
+
+
+def snapshot(trainer):
+    # only valid between generations (nothing of current generation simulated yet), fitness cache is added when saving
+    arrays = trainer.pop.checkpoint()
+    arrays["version"] = np.array(CHECKPOINT_VERSION)
+    arrays["rng_state"] = np.array(json.dumps(genome.rng.bit_generator.state)) # genome operators' random state
+    arrays["trainer_generations"] = np.array(trainer.generations)
+    arrays["trainer_ticks"] = np.array(trainer.total_ticks)
+    return arrays
+
+
+def save_checkpoint(path, arrays, fitness_cache=None):
+    if fitness_cache is not None: # only changes which genomes are simulated, not their results
+        arrays = dict(arrays, **{f"cache_{name}": array for name, array in fitness_cache.to_arrays().items()})
+    with atomic_write(path) as file:
+        np.savez(file, **arrays)
+
+
+def load_checkpoint(path, trainer):
+    with np.load(path) as data:
+        arrays = {name: data[name] for name in data.files}
+    if int(arrays["version"]) != CHECKPOINT_VERSION:
+        raise ValueError(f"checkpoint version {int(arrays['version'])} can't be loaded (expected {CHECKPOINT_VERSION})")
+
+    trainer.pop.restore(arrays)
+    genome.rng.bit_generator.state = json.loads(str(arrays["rng_state"]))
+    trainer.generations = int(arrays["trainer_generations"])
+    trainer.total_ticks = int(arrays["trainer_ticks"])
+    trainer.iterations = 1
+
+
+class Checkpointer(Observer):
+    def __init__(self, path, interval=CHECKPOINT_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.latest = None # snapshot of latest generation start (not saved yet), small since it doesn't include the fitness cache
+        self.generations = 0 # generations since last save
+
+
+    def on_evolve(self, trainer):
+        self.latest = snapshot(trainer)
+        self.generations += 1
+        if self.generations >= self.interval:
+            self.save(trainer)
+
+
+    def on_finish(self, trainer):
+        self.save(trainer) # training stopped during a generation continues from its start
+
+
+    def save(self, trainer):
+        if self.latest is not None:
+            save_checkpoint(self.path, self.latest, trainer.pop.fitness_cache)
+            self.latest = None
+        self.generations = 0
@@ -0,0 +1,69 @@
+"""
+file for config class (runtime settings)
+tasks:
+1. copying the simulation and training settings of settings.py into an object, so runs with different settings can share a process
+2. overriding settings by name (only settings that are read at runtime, others stay module constants)
+3. parsing setting values given on the command line
+note: world size, colors, track compilation and display settings can't be overridden
+"""
+import ast
+import settings
+
+RUNTIME_SETTINGS = (
+    # environment
+    "FILE_NAME", "TRACK_LENGTH", "USE_DISTANCE_FIELD", "RAY_CASTER", "RAY_STEP", "SPHERE_TRACE_STEPS", "CAR_SAMPLE_SPACING",
+    # population
+    "POP_SIZE", "NUM_PARENTS", "ELITISM", "FITNESS_CACHE_SIZE", "WARM_START_MUTATION",
+    # agent
+    "AGENT_START", "SENSOR_ANGLES", "MAX_SENSOR_DIST", "MAX_ANG_VEL", "MAX_SPEED", "MIN_SPEED", "TIMESTEP", "SWEEP_SPACING",
+    "MAX_EPISODE_TICKS", "STALL_WINDOW", "STALL_MIN_PROGRESS", "BEST_CUTOFF", "DIST_WEIGHT", "AVG_SPEED_WEIGHT",
+    # genome
+    "MUT_RATE", "MAX_WEIGHT", "INITIAL_MUT_MAG", "DECAY_RATE", "FITNESS_SCALE", "CROSSOVER", "BLEND_ALPHA",
+    "HALVING_ROUNDS", "HALVING_ETA", "HALVING_MIN_TICKS",
+    # neural network
+    "NUM_HIDDEN_NEURONS", "HIDDEN_LAYERS", "USE_BIASES", "HIDDEN_ACTIVATION", "OUTPUT_ACTIVATION"
+)
+
+
+class Config():
+    def __init__(self, **overrides):
+        # defaults are read from settings.py when the config is created
+        for name in RUNTIME_SETTINGS:
+            setattr(self, name, getattr(settings, name))
+
+        for name, value in overrides.items():
+            if name not in RUNTIME_SETTINGS:
+                raise ValueError(f"{name} is not a runtime setting")
+            setattr(self, name, value)
+        self.overrides = dict(overrides) # settings that differ from settings.py
+
+        if "NUM_HIDDEN_NEURONS" in overrides and "HIDDEN_LAYERS" not in overrides: # HIDDEN_LAYERS defaults to one layer of NUM_HIDDEN_NEURONS
+            self.HIDDEN_LAYERS = (self.NUM_HIDDEN_NEURONS,)
+
+
+    def replace(self, **overrides):
+        # copy with more settings overridden
+        return Config(**{**self.overrides, **overrides})
+
+
+    def __repr__(self):
+        return f"Config({', '.join(f'{name}={value!r}' for name, value in self.overrides.items())})"
+
+
+def parse_value(text):
+    # python literal (number, tuple, None, True, ...), anything else is a string
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+
+def parse_overrides(items):
+    # ["NAME=VALUE", ...] to {NAME: value}
+    overrides = {}
+    for item in items or []:
+        name, separator, value = item.partition("=")
+        if not separator:
+            raise ValueError(f"expected NAME=VALUE, got {item}")
+        overrides[name.strip()] = parse_value(value.strip())
+    return overrides
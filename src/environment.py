@@ -1,42 +1,91 @@
 """
 file for environment class
 including:
-1. loading track data
-2. converting track segment data to pygame surface objects
+1. loading compiled track data
+2. converting track segment data to pygame surface objects (when first needed)
 3. displaying the track to the window
-4. track segment collision detection with car
-5. spatial partitioning (constructing spatial grid)
-6. casting sensor rays
-7. rendering text to window
+4. track segment collision detection with car (one car with masks, or all cars with occupancy lookups)
+5. spatial partitioning (spatial grid of compiled track)
+6. casting sensor rays (whole population at once)
+7. exact ray casting against segment edges (grid traversal)
+8. distance field collision lookups and sphere traced rays
+9. rendering text to window
 """
 
 import pygame
 from settings import *
+from config import Config
 import math
-import json
+import numpy as np
+from track_compiler import compile_track, build_track
+from profiler import profiler
+from sprite_cache import sprite_cache
 
 
 
 class Environment:
-    def __init__(self):
-        self.track_segments = [] # list of track segments
+    def __init__(self, filename=None, config:Config=None):
+        self.config = config if config is not None else Config()
+        filename = filename or self.config.FILE_NAME
         self.grid = {} # dictionary of grid cells: (grid_x, grid_y)
-
-        self._load_track(FILE_NAME)
-        self._create_grid() # create spatial grid for track segments
+        self.filename = filename
+        self._track_segments = None # pygame surfaces and masks of segments, created when first needed
+        self._track_layer = None # whole track drawn once, created when first drawn
+        self._text_cache = {} # HUD line position: ((text, color), rendered surface)
+        self.distance_field = None
+        self._outline_pixels = None # car outlines as flat occupancy indices, created when first needed
+
+        self._load_track(filename)
+
+        # car outline sample points relative to its center (no gap wider than a track segment)
+        samples_x = np.linspace(-AGENT_WIDTH / 2, AGENT_WIDTH / 2, math.ceil(AGENT_WIDTH / self.config.CAR_SAMPLE_SPACING) + 1)
+        samples_y = np.linspace(-AGENT_HEIGHT / 2, AGENT_HEIGHT / 2, math.ceil(AGENT_HEIGHT / self.config.CAR_SAMPLE_SPACING) + 1)
+        self.car_outline = np.unique(np.concatenate((
+            np.stack((samples_x, np.full_like(samples_x, -AGENT_HEIGHT / 2)), axis=1),
+            np.stack((samples_x, np.full_like(samples_x, AGENT_HEIGHT / 2)), axis=1),
+            np.stack((np.full_like(samples_y, -AGENT_WIDTH / 2), samples_y), axis=1),
+            np.stack((np.full_like(samples_y, AGENT_WIDTH / 2), samples_y), axis=1)
+        )), axis=0)
+        self.car_radius = math.hypot(AGENT_WIDTH / 2, AGENT_HEIGHT / 2)
+
+        self.sensor_angles = np.radians(np.array(self.config.SENSOR_ANGLES, dtype=np.float64))
+        self.max_sensor_dist = self.config.MAX_SENSOR_DIST
+        self.ray_distances = np.append(np.arange(0, self.max_sensor_dist, self.config.RAY_STEP), self.max_sensor_dist).astype(np.float64) # sample distances along ray (last = no collision)
 
 
     def _load_track(self, filename):
-        # load json file data from track_editor.py
+        # load compiled arrays of json file from track_editor.py (compiled and cached by track_compiler.py)
         try:
-            with open(filename, "r") as file:
-                data = json.load(file)
-            for seg in data:
-                self._add_segment(seg["x"], seg["y"], seg["angle"], seg["height"], seg["width"])
-            print(f"Loaded {len(data)} track segments from {filename}")
+            track = compile_track(filename, self.config.USE_DISTANCE_FIELD or self.config.RAY_CASTER == "sphere")
+            print(f"Loaded {len(track['segments'])} track segments from {filename}")
 
         except Exception as e:
             print(f"Error loading track: {e}")
+            track = build_track([])
+
+        self.segment_data = track["segments"] # x, y, angle, height, width of each segment
+        self.occupancy = track["occupancy"] # occupancy array for sensor rays
+        self.edges = track["edges"] # segment edges for analytic rays
+        self.cell_edges = track["cell_edges"] # edge indices of each grid cell
+        self.grid_cols = math.ceil(WORLD_WIDTH / GRID_SIZE)
+        self.grid_rows = math.ceil(WORLD_HEIGHT / GRID_SIZE)
+        if "distance_field" in track:
+            self.distance_field = track["distance_field"] # distance to nearest wall for every world pixel
+
+        # spatial grid for track segments
+        offsets = track["grid_offsets"].tolist()
+        for cell_i, cell_key in enumerate(map(tuple, track["grid_cells"].tolist())):
+            self.grid[cell_key] = track["grid_segments"][offsets[cell_i]:offsets[cell_i + 1]].tolist()
+
+
+    @property
+    def track_segments(self):
+        # list of track segments, only needed for mask collision and drawing
+        if self._track_segments is None:
+            self._track_segments = []
+            for x, y, angle, height, width in self.segment_data.tolist():
+                self._add_segment(x, y, angle, int(height), int(width))
+        return self._track_segments
 
 
     def _add_segment(self, x, y, angle=0, height=100, width=10):
@@ -53,36 +102,10 @@ class Environment:
             "rect": rect,
             "mask": mask
         }
-        self.track_segments.append(segment)
-
-
-    def _create_grid(self):
-        print("Building spatial grid...")
-
-        for seg_idx, segment in enumerate(self.track_segments): # iterate through segments
-            rect = segment["rect"]
-
-            # find cell current segment overlaps
-            left_cell = rect.left // GRID_SIZE
-            right_cell = rect.right // GRID_SIZE
-            top_cell = rect.top // GRID_SIZE
-            bottom_cell = rect.bottom // GRID_SIZE
+        self._track_segments.append(segment)
 
-            for grid_x in range(left_cell, right_cell + 1):
-                for grid_y in range(top_cell, bottom_cell + 1):
-                    cell_key = (grid_x, grid_y)
 
-                    # add cell to grid if it hasn't been added yet
-                    if cell_key not in self.grid:
-                        self.grid[cell_key] = []
-
-                    self.grid[cell_key].append(seg_idx) # add segment to cell of grid that it's in
-
-        print(f"Grid built with {len(self.grid)} cells")
-
-    
-    def is_on_track(self, car_surface:pygame.Surface, car_rect:pygame.Rect):
-        car_mask = pygame.mask.from_surface(car_surface) # create mask for car
+    def is_on_track(self, car_mask:pygame.mask.Mask, car_rect:pygame.Rect):
         nearby_segments = self._get_nearby_segments(car_rect) # determine which segments need to be checked for collision (nearby)
 
         for segment in nearby_segments:
@@ -93,12 +116,74 @@ class Environment:
                 segment["rect"].x - car_rect.x,
                 segment["rect"].y - car_rect.y
                 ) # determine offset
+            if profiler.enabled:
+                profiler.count("mask_tests")
             if car_mask.overlap(segment["mask"], offset): # check for collision
                 return False # car collides with segment
             
         return True # car doesn't collide with segments
     
 
+    def is_on_track_fast(self, positions, angles):
+        # distance field collision for (num_agents, 2) positions and (num_agents,) angles in degrees
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        angles = np.radians(np.asarray(angles, dtype=np.float64).reshape(-1))
+        on_track = self._field_lookup(positions[:, 0], positions[:, 1], DIST_FIELD_MAX) > self.car_radius + 2 # whole car is clear of walls
+
+        # cars close to a wall: check points along the outline of the rotated car
+        near = np.nonzero(~on_track)[0]
+        if len(near):
+            cos_a = np.cos(angles[near])[:, None]
+            sin_a = np.sin(angles[near])[:, None]
+            xs = positions[near, 0, None] + self.car_outline[:, 0] * cos_a - self.car_outline[:, 1] * sin_a
+            ys = positions[near, 1, None] + self.car_outline[:, 0] * sin_a + self.car_outline[:, 1] * cos_a
+            on_track[near] = (self._field_lookup(xs, ys, DIST_FIELD_MAX) > 0).all(axis=1) # leaving the world is checked by the agent
+
+        return on_track
+
+
+    def is_on_track_masks(self, positions, angles):
+        # same result as is_on_track with cached car masks, for (num_agents, 2) positions and (num_agents,) angles in degrees
+        # occupancy is the union of all segment masks, so a car collides if any pixel of its outline is occupied
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        angles = np.asarray(angles, dtype=np.float64).reshape(-1)
+        if self._outline_pixels is None:
+            offsets = sprite_cache.mask_offsets()
+            self._outline_margin = np.abs(offsets).max() # furthest outline pixel from car center
+            self._outline_pixels = offsets[:, :, 0] * WORLD_HEIGHT + offsets[:, :, 1] # flat occupancy index relative to car center
+            self._flat_occupancy = np.ascontiguousarray(self.occupancy).reshape(-1)
+
+        # rect center is rounded half up (like pygame for positive coordinates)
+        centers = np.floor(positions)
+        centers += positions - centers >= 0.5
+        centers = centers.astype(np.int64)
+
+        # cars reaching past the world border are tested with masks (segments can stick out of the world)
+        margin = self._outline_margin
+        xs = np.clip(centers[:, 0], margin, WORLD_WIDTH - 1 - margin)
+        ys = np.clip(centers[:, 1], margin, WORLD_HEIGHT - 1 - margin)
+        near_border = (xs != centers[:, 0]) | (ys != centers[:, 1])
+
+        pixels = (xs * WORLD_HEIGHT + ys)[:, None] + self._outline_pixels[sprite_cache.angle_steps(angles)]
+        on_track = ~self._flat_occupancy[pixels].any(axis=1)
+        if profiler.enabled:
+            profiler.count("mask_tests", len(positions))
+
+        for i in np.nonzero(near_border)[0]:
+            surface, mask = sprite_cache.get(angles[i], True)
+            on_track[i] = self.is_on_track(mask, surface.get_rect(center=(positions[i, 0], positions[i, 1])))
+        return on_track
+
+
+    def _field_lookup(self, xs, ys, outside=0):
+        # distance field value at (xs, ys), outside value for points beyond the world
+        xs = xs.astype(np.int64)
+        ys = ys.astype(np.int64)
+        in_world = (xs >= 0) & (xs < WORLD_WIDTH) & (ys >= 0) & (ys < WORLD_HEIGHT)
+        values = self.distance_field[np.clip(xs, 0, WORLD_WIDTH - 1), np.clip(ys, 0, WORLD_HEIGHT - 1)].astype(np.int64)
+        return np.where(in_world, values, outside)
+
+
     def _get_nearby_segments(self, rect):
         # determine cells the car is contained in
         left_cell = rect.left // GRID_SIZE
@@ -117,86 +202,193 @@ class Environment:
         return [self.track_segments[i] for i in segment_indices] # return nearby segments
     
 
-    def cast_all_rays(self, agent_pos, agent_angle):
-        distances = []
-        collision_points = []
-
-        # iterate each sensor angle
-        for offset_angle in SENSOR_ANGLES:
-            ray_angle = agent_angle + offset_angle
-            
-            dx = math.cos(math.radians(ray_angle))
-            dy = math.sin(math.radians(ray_angle))
-            dir_vec = pygame.Vector2(dx, dy)
+    def cast_all_rays(self, positions, angles):
+        # positions: (num_agents, 2), angles: (num_agents,) in degrees
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        angles = np.radians(np.asarray(angles, dtype=np.float64).reshape(-1))
+
+        # direction of every sensor ray of every agent: (num_agents, num_sensors)
+        ray_angles = angles[:, None] + self.sensor_angles[None, :]
+        dx = np.cos(ray_angles)
+        dy = np.sin(ray_angles)
+
+        if self.config.RAY_CASTER == "analytic":
+            return self._cast_rays_analytic(positions, dx, dy)
+        if self.config.RAY_CASTER == "sphere":
+            return self._cast_rays_sphere(positions, dx, dy)
+        return self._cast_rays_march(positions, dx, dy)
+
+
+    def _cast_rays_march(self, positions, dx, dy):
+        # flatten rays and sample each one from its origin
+        num_agents, num_sensors = dx.shape
+        ox = np.repeat(positions[:, 0], num_sensors)
+        oy = np.repeat(positions[:, 1], num_sensors)
+        distances, collision_points = self._march_rays(ox, oy, dx.ravel(), dy.ravel(), np.zeros(len(ox)))
+        return (distances / self.max_sensor_dist).reshape(num_agents, num_sensors), collision_points.reshape(num_agents, num_sensors, 2)
+
+
+    def _cast_rays_analytic(self, positions, dx, dy):
+        # flatten rays: origin (ox, oy) and unit direction (dx, dy)
+        num_agents, num_sensors = dx.shape
+        ox = np.repeat(positions[:, 0], num_sensors)
+        oy = np.repeat(positions[:, 1], num_sensors)
+        dx = dx.ravel()
+        dy = dy.ravel()
+
+        # rays end at max sensor distance or the world border, whichever is closer
+        with np.errstate(divide="ignore", invalid="ignore"):
+            exit_x = np.where(dx > 0, (WORLD_WIDTH - ox) / dx, np.where(dx < 0, -ox / dx, np.inf))
+            exit_y = np.where(dy > 0, (WORLD_HEIGHT - oy) / dy, np.where(dy < 0, -oy / dy, np.inf))
+        inside = (ox >= 0) & (ox < WORLD_WIDTH) & (oy >= 0) & (oy < WORLD_HEIGHT)
+        distances = np.where(inside, np.minimum(self.max_sensor_dist, np.minimum(exit_x, exit_y)), 0.0)
+
+        # rays starting inside a segment hit immediately
+        origin_x = np.clip(ox.astype(np.int64), 0, WORLD_WIDTH - 1)
+        origin_y = np.clip(oy.astype(np.int64), 0, WORLD_HEIGHT - 1)
+        distances[inside & self.occupancy[origin_x, origin_y]] = 0.0
+
+        # grid traversal setup (Amanatides-Woo): current cell, step direction, distance to next cell border and per cell
+        cell_x = np.floor(ox / GRID_SIZE).astype(np.int64)
+        cell_y = np.floor(oy / GRID_SIZE).astype(np.int64)
+        step_x = np.where(dx > 0, 1, -1)
+        step_y = np.where(dy > 0, 1, -1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            next_x = np.where(dx != 0, ((cell_x + (dx > 0)) * GRID_SIZE - ox) / dx, np.inf)
+            next_y = np.where(dy != 0, ((cell_y + (dy > 0)) * GRID_SIZE - oy) / dy, np.inf)
+            delta_x = np.where(dx != 0, GRID_SIZE / np.abs(dx), np.inf)
+            delta_y = np.where(dy != 0, GRID_SIZE / np.abs(dy), np.inf)
+
+        cell_start = np.zeros_like(ox) # distance along ray where current cell is entered
+        searching = cell_start < distances # rays still walking the grid
+
+        while searching.any():
+            rays = np.nonzero(searching)[0]
+            if profiler.enabled:
+                profiler.count("ray_steps", len(rays)) # one grid cell per searching ray
+            cell_end = np.minimum(next_x[rays], next_y[rays])
+
+            # test every edge in the current cell of each searching ray: (num_rays, max_edges)
+            in_grid = (cell_x[rays] >= 0) & (cell_x[rays] < self.grid_cols) & (cell_y[rays] >= 0) & (cell_y[rays] < self.grid_rows)
+            cells = np.where(in_grid, cell_x[rays] * self.grid_rows + cell_y[rays], 0)
+            edge_indices = np.where(in_grid[:, None], self.cell_edges[cells], -1)
+            edges = self.edges[edge_indices]
+
+            # ray-segment intersection: origin + t * dir = edge start + u * edge vector
+            rel_x = edges[:, :, 0] - ox[rays, None]
+            rel_y = edges[:, :, 1] - oy[rays, None]
+            denom = dx[rays, None] * edges[:, :, 3] - dy[rays, None] * edges[:, :, 2]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                t = (rel_x * edges[:, :, 3] - rel_y * edges[:, :, 2]) / denom
+                u = (rel_x * dy[rays, None] - rel_y * dx[rays, None]) / denom
+            valid = (edge_indices >= 0) & (denom != 0) & (t >= 0) & (u >= 0) & (u <= 1)
+            closest = np.where(valid, t, np.inf).min(axis=1)
+
+            # hits inside the current cell are final, otherwise step into next cell
+            found = closest <= cell_end
+            distances[rays[found]] = np.minimum(distances[rays[found]], closest[found])
+
+            step_in_x = next_x[rays] < next_y[rays]
+            cell_start[rays] = cell_end
+            cell_x[rays] += np.where(step_in_x, step_x[rays], 0)
+            cell_y[rays] += np.where(step_in_x, 0, step_y[rays])
+            next_x[rays] += np.where(step_in_x, delta_x[rays], 0)
+            next_y[rays] += np.where(step_in_x, 0, delta_y[rays])
+
+            searching[rays[found]] = False
+            searching &= cell_start < distances
+
+        collision_points = np.stack((ox + dx * distances, oy + dy * distances), axis=1)
+        return (distances / self.max_sensor_dist).reshape(num_agents, num_sensors), collision_points.reshape(num_agents, num_sensors, 2)
+
+
+    def _cast_rays_sphere(self, positions, dx, dy):
+        # step along each ray by the distance to the nearest wall (sphere tracing)
+        num_agents, num_sensors = dx.shape
+        ox = np.repeat(positions[:, 0], num_sensors)
+        oy = np.repeat(positions[:, 1], num_sensors)
+        dx = dx.ravel()
+        dy = dy.ravel()
+
+        distances = np.zeros_like(ox)
+        searching = np.ones(ox.shape, dtype=bool)
+        for _ in range(self.config.SPHERE_TRACE_STEPS):
+            rays = np.nonzero(searching)[0]
+            if not len(rays):
+                break
+            if profiler.enabled:
+                profiler.count("ray_steps", len(rays))
+
+            wall_dist = self._field_lookup(ox[rays] + dx[rays] * distances[rays], oy[rays] + dy[rays] * distances[rays])
+            hit = wall_dist == 0
+
+            # step is shortened by 2 pixels since field is measured between whole pixels
+            distances[rays] = np.where(hit, distances[rays], np.minimum(distances[rays] + np.maximum(wall_dist - 2, 1), self.max_sensor_dist))
+            searching[rays] = ~hit & (distances[rays] < self.max_sensor_dist)
+
+        # rays near walls (short steps) can run out of steps, finish them with fixed RAY_STEP samples instead of reporting a wall
+        rays = np.nonzero(searching)[0]
+        if len(rays):
+            distances[rays] = self._march_rays(ox[rays], oy[rays], dx[rays], dy[rays], distances[rays])[0]
+
+        collision_points = np.stack((ox + dx * distances, oy + dy * distances), axis=1)
+        return (distances / self.max_sensor_dist).reshape(num_agents, num_sensors), collision_points.reshape(num_agents, num_sensors, 2)
+
+
+    def _march_rays(self, ox, oy, dx, dy, start):
+        # distance and pixel of first occupied sample of flat rays, sampled every RAY_STEP from start (max sensor distance if nothing was found)
+        samples = np.minimum(start[:, None] + self.ray_distances, self.max_sensor_dist) # (num_rays, num_samples)
+        xs = (ox[:, None] + dx[:, None] * samples).astype(np.int64)
+        ys = (oy[:, None] + dy[:, None] * samples).astype(np.int64)
+
+        out_of_bounds = (xs < 0) | (xs >= WORLD_WIDTH) | (ys < 0) | (ys >= WORLD_HEIGHT)
+        hits = out_of_bounds | self.occupancy[np.clip(xs, 0, WORLD_WIDTH - 1), np.clip(ys, 0, WORLD_HEIGHT - 1)]
+        hits[:, -1] = True # end of ray counts as a hit if nothing was found
+
+        if profiler.enabled:
+            profiler.count("ray_steps", hits.size)
+        rows = np.arange(len(samples))
+        first_hit = hits.argmax(axis=1) # index of first collision along each ray
+        return samples[rows, first_hit], np.stack((xs[rows, first_hit], ys[rows, first_hit]), axis=1)
 
-            distance, collision_point = self._cast_single_ray(agent_pos, dir_vec)
 
-            distances.append(distance/MAX_SENSOR_DIST) # normalized distance
-            collision_points.append(collision_point)
-
-        return distances, collision_points
-
-
-    def _cast_single_ray(self, agent_pos, dir_vec):
-        for distance in range(0, MAX_SENSOR_DIST, RAY_STEP):
-            point = pygame.Vector2(
-                int(agent_pos.x + dir_vec.x * distance),
-                int(agent_pos.y + dir_vec.y * distance)
-            )
-            
-            # check if out of bounds
-            if point.x < 0 or point.x >= WORLD_WIDTH or point.y < 0 or point.y >= WORLD_HEIGHT:
-                return distance, point
-            
-            # check for collision with segment in cell
-            if self._point_collision(point):
-                return distance, point
-            
-        # no collision found
-        end_point = pygame.Vector2(
-            int(agent_pos.x + dir_vec.x * MAX_SENSOR_DIST),
-            int(agent_pos.y + dir_vec.y * MAX_SENSOR_DIST)
-        )
-        return MAX_SENSOR_DIST, end_point
-            
-            
-    def _point_collision(self, point):
-        grid_x = point.x // GRID_SIZE
-        grid_y = point.y // GRID_SIZE
-        cell_key = (grid_x, grid_y)
-
-        if cell_key in self.grid: # check if any segments are in same cell as point
-            # check each segment for collision
-            for seg_idx in self.grid[cell_key]:
-                segment = self.track_segments[seg_idx]
-                offset_x = point.x - segment["rect"].x
-                offset_y = point.y - segment["rect"].y
-
-                try:
-                    if segment["mask"].get_at((offset_x, offset_y)):
-                        return True
-                except:
-                    continue
-        return False
+    def draw(self, screen:pygame.Surface, font, pop, camera_offset):
+        self.draw_track(screen, camera_offset)
 
+        # display text
+        best_agent = pop.best_agents[0]
+        self.draw_text(screen, font, f"Generation: {pop.generation}", (10, 10))
+        self.draw_text(screen, font, f"Turn Rate (degrees/frame): {best_agent.angular_velocity: .2f}", (10, 30))
+        self.draw_text(screen, font, f"Speed (pixels/frame): {best_agent.speed: .2f}", (10, 50))
+        self.draw_text(screen, font, f"Fitness: {best_agent.fitness: .2f}", (10, 70))
 
 
-    def draw(self, screen:pygame.Surface, font, pop, camera_offset):
-        # Draw the track
+    def draw_track(self, screen:pygame.Surface, camera_offset):
+        # Draw the track (only the part of the pre-rendered layer that is in view)
         screen_rect = pygame.Rect(camera_offset.x, camera_offset.y, SCREEN_WIDTH, SCREEN_HEIGHT)
-        for segment in self.track_segments:
-            if segment["rect"].colliderect(screen_rect): # check if segment is in view
-                offset_rect = segment["rect"].move(-camera_offset.x, -camera_offset.y)
-                screen.blit(segment["surface"], offset_rect)
-        
-        # display text
-        best_agent = pop.best_agents[0]
-        generation_text = font.render(f"Generation: {pop.generation}", True, TEXT_COLOR)
-        turn_text = font.render(f"Turn Rate (degrees/frame): {best_agent.angular_velocity: .2f}", True, TEXT_COLOR)
-        speed_text = font.render(f"Speed (pixels/frame): {best_agent.speed: .2f}", True, TEXT_COLOR)
-        fitness_text = font.render(f"Fitness: {best_agent.fitness: .2f}", True, TEXT_COLOR)
-
-        screen.blit(generation_text, (10, 10))
-        screen.blit(turn_text, (10, 30))
-        screen.blit(speed_text, (10, 50))
-        screen.blit(fitness_text, (10, 70))
\ No newline at end of file
+        screen.blit(self.track_layer, (0, 0), area=screen_rect)
+
+
+    @property
+    def track_layer(self):
+        # every segment drawn once into a world-sized surface
+        if self._track_layer is None:
+            self._track_layer = pygame.Surface((WORLD_WIDTH, WORLD_HEIGHT))
+            self._track_layer.fill(TRACK_LAYER_KEY)
+            for segment in self.track_segments:
+                self._track_layer.blit(segment["surface"], segment["rect"])
+
+            # color key instead of per pixel alpha, run-length encoded so empty space is skipped when blitting
+            self._track_layer.set_colorkey(TRACK_LAYER_KEY, pygame.RLEACCEL)
+            if pygame.display.get_surface() is not None:
+                self._track_layer = self._track_layer.convert() # match display format for faster blits
+        return self._track_layer
+
+
+    def draw_text(self, screen:pygame.Surface, font, text, position, color=TEXT_COLOR):
+        # text is only rendered again when it changed since last frame
+        cached_text, surface = self._text_cache.get(position, (None, None))
+        if (text, color) != cached_text:
+            surface = font.render(text, True, color)
+            self._text_cache[position] = ((text, color), surface)
+        screen.blit(surface, position)
\ No newline at end of file
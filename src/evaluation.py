@@ -0,0 +1,148 @@
+"""
+file for genome evaluation outside of the tick-by-tick main loop
+tasks:
+1. running full episodes of a group of genomes to completion (headless)
+2. sharding a generation across worker processes, each with its own environment
+3. returning fitness, distance, tick count and end reason of every genome
+4. evaluating a generation in the current process
+5. screening candidate genomes with successive halving (short episodes first, only the fittest continue)
+"""
+import math
+import multiprocessing
+import os
+import signal
+import numpy as np
+from settings import *
+from config import Config
+from environment import Environment
+from agent_state import AgentState, END_REASONS
+from neural_network import BatchNeuralNetwork, network_layer_sizes
+
+
+def run_episode(env:Environment, weights, config:Config):
+    # simulate genomes (one row of weights each) until every agent is dead
+    state = AgentState(len(weights), config)
+    network = BatchNeuralNetwork(network_layer_sizes(config), weights, config)
+
+    iterations = 1
+    while state.alive.any():
+        state.step(env, network, iterations)
+        iterations += 1
+
+    return state.fitnesses, state.distances, state.ticks, state.end_reasons
+
+
+class SerialEvaluator():
+    def __init__(self, env:Environment=None, config:Config=None):
+        self.env = env if env is not None else Environment(config=config)
+
+
+    def evaluate(self, weights, config):
+        return run_episode(self.env, weights, config)
+
+
+######################################################################################
+# Worker processes
+######################################################################################
+
+worker_env = None # environment of worker process, loaded once
+
+
+def _init_worker(config):
+    global worker_env
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Ctrl+C stops the trainer in the main process, which closes the pool
+    worker_env = Environment(config=config)
+
+
+def _evaluate_shard(args):
+    weights_buffer, num_weights, config = args
+    weights = np.frombuffer(weights_buffer, dtype=np.float64).reshape(-1, num_weights) # flat buffer back to one row per genome
+    return run_episode(worker_env, weights, config)
+
+
+class ParallelEvaluator():
+    def __init__(self, num_workers=NUM_WORKERS, config:Config=None):
+        self.num_workers = num_workers or os.cpu_count()
+        self.pool = multiprocessing.Pool(self.num_workers, initializer=_init_worker, initargs=(config,))
+
+
+    def evaluate(self, weights, config):
+        # weights: (num_genomes, num_weights), one shard of genomes per worker
+        weights = np.ascontiguousarray(weights, dtype=np.float64)
+        shards = [shard for shard in np.array_split(weights, self.num_workers) if len(shard)]
+        results = self.pool.map(_evaluate_shard, [(shard.tobytes(), weights.shape[1], config) for shard in shards])
+
+        fitnesses, distances, ticks, end_reasons = zip(*results)
+        return np.concatenate(fitnesses), np.concatenate(distances), np.concatenate(ticks), np.concatenate(end_reasons)
+
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+
+######################################################################################
+# Successive halving
+######################################################################################
+
+class SuccessiveHalving():
+    # picks the genomes of a large candidate pool worth a full episode
+    def __init__(self, env:Environment, config:Config):
+        self.env = env
+        self.config = config
+        self.screened = 0 # candidates screened so far
+        self.ticks = 0 # ticks simulated while screening
+
+
+    def pool_size(self, num_selected):
+        # candidates needed so that dividing by HALVING_ETA every round leaves num_selected
+        return num_selected * self.config.HALVING_ETA ** self.config.HALVING_ROUNDS
+
+
+    def budgets(self):
+        # frames each round's episodes last in total (never longer than a full episode)
+        budgets = [self.config.HALVING_MIN_TICKS * self.config.HALVING_ETA ** round_i for round_i in range(self.config.HALVING_ROUNDS)]
+        if self.config.MAX_EPISODE_TICKS:
+            budgets = [min(budget, self.config.MAX_EPISODE_TICKS) for budget in budgets]
+        return budgets
+
+
+    def screen(self, weights, num_selected):
+        # rows of weights of the num_selected best candidates, best first
+        candidates = np.arange(len(weights)) # rows still screened
+        state = AgentState(len(weights), self.config)
+        budget_ended = END_REASONS.index("tick_budget")
+        iterations = 1
+        budgets = self.budgets()
+
+        for round_i, budget in enumerate(budgets):
+            # episodes of promoted candidates continue until the longer budget (no cutoff against NUM_PARENTS, more are kept)
+            state.config = self.config.replace(MAX_EPISODE_TICKS=budget, BEST_CUTOFF=False)
+            network = BatchNeuralNetwork(network_layer_sizes(self.config), weights[candidates], self.config)
+            while state.alive.any():
+                state.step(self.env, network, iterations)
+                iterations += 1
+                self.ticks += 1
+
+            # fitness over the whole budget, so candidates that crashed early count as standing still for the rest of it
+            fitnesses = state.fitness_of(state.distances, budget)
+            last = round_i == len(budgets) - 1
+            keep = num_selected if last else max(num_selected, math.ceil(len(candidates) / self.config.HALVING_ETA))
+            order = np.argsort(-fitnesses, kind="stable")[:keep]
+            candidates = candidates[order]
+            state = state.take(order)
+
+            # candidates stopped by the budget drive on in the next round
+            revived = state.end_reasons == budget_ended
+            state.alive[revived] = True
+            state.end_reasons[revived] = END_REASONS.index("running")
+
+        self.screened += len(weights)
+        return candidates
+
+
+    def stats(self):
+        return {
+            "screened": self.screened,
+            "ticks": self.ticks
+        }
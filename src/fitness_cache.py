@@ -0,0 +1,87 @@
+"""
+file for fitness cache class
+tasks:
+1. remembering episode results (fitness, distance, ticks, end reason, final pose) keyed by genome hash
+2. ending episodes of already simulated genomes before they are simulated again
+3. evicting least recently used results and counting hits and misses
+4. converting results to arrays and back (checkpoints)
+note: the simulation is deterministic, so results are only valid for the environment they were recorded on
+"""
+import numpy as np
+from collections import OrderedDict
+from settings import *
+from agent_state import END_REASONS
+from genome import KEY_SIZE
+from cache_stats import CacheStats
+
+
+class FitnessCache(CacheStats):
+    def __init__(self, max_size=FITNESS_CACHE_SIZE):
+        self.max_size = max_size
+        self.results = OrderedDict() # genome key: (fitness, distance, ticks, end reason, position, angle)
+        self.hits = 0
+        self.misses = 0
+
+
+    def restore(self, keys, state):
+        # end episodes of genomes with a recorded result, returns mask of restored agents
+        restored = np.zeros(len(keys), dtype=bool)
+        for i, key in enumerate(keys):
+            result = self.results.get(key)
+            if result is None:
+                self.misses += 1
+                continue
+
+            self.hits += 1
+            self.results.move_to_end(key) # mark as recently used
+            fitness, distance, ticks, end_reason, position, angle = result
+            state.fitnesses[i] = fitness
+            state.distances[i] = distance
+            state.ticks[i] = ticks
+            state.end_reasons[i] = end_reason
+            state.positions[i] = position
+            state.sensor_points[i] = position
+            state.angles[i] = angle
+            state.alive[i] = False
+            restored[i] = True
+
+        return restored
+
+
+    def store(self, keys, state, indices):
+        # record finished episodes (cut off episodes depend on the rest of the population)
+        cut_off = END_REASONS.index("cannot_beat_best")
+        for i in indices:
+            if state.alive[i] or state.end_reasons[i] == cut_off:
+                continue
+
+            self.results[keys[i]] = (float(state.fitnesses[i]), float(state.distances[i]), int(state.ticks[i]),
+                                     int(state.end_reasons[i]), state.positions[i].copy(), float(state.angles[i]))
+            self.results.move_to_end(keys[i])
+            if len(self.results) > self.max_size:
+                self.results.popitem(last=False) # evict least recently used result
+
+
+    def to_arrays(self):
+        # results as arrays in least to most recently used order
+        results = list(self.results.values())
+        return {
+            "keys": np.array([np.frombuffer(key, dtype=np.uint8) for key in self.results], dtype=np.uint8).reshape(len(results), KEY_SIZE),
+            "fitnesses": np.array([result[0] for result in results], dtype=np.float64),
+            "distances": np.array([result[1] for result in results], dtype=np.float64),
+            "ticks": np.array([result[2] for result in results], dtype=np.int64),
+            "end_reasons": np.array([result[3] for result in results], dtype=np.int8),
+            "positions": np.array([result[4] for result in results], dtype=np.float64).reshape(len(results), 2),
+            "angles": np.array([result[5] for result in results], dtype=np.float64)
+        }
+
+
+    def from_arrays(self, arrays):
+        self.results = OrderedDict()
+        for i in range(len(arrays["keys"])):
+            self.results[arrays["keys"][i].tobytes()] = (float(arrays["fitnesses"][i]), float(arrays["distances"][i]), int(arrays["ticks"][i]),
+                                                         int(arrays["end_reasons"][i]), arrays["positions"][i].copy(), float(arrays["angles"][i]))
+
+
+    def __len__(self):
+        return len(self.results)
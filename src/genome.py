@@ -4,49 +4,110 @@ tasks:
 1. initializing weights
 2. crossover between self and other instance of class
 3. mutation based on fitness
+4. batched operators on a whole population (one genome per matrix row)
+5. hashing genomes (fitness cache keys)
 """
-import random
+import hashlib
 import math
+import numpy as np
 from settings import *
+from config import Config
+from neural_network import network_layer_sizes, count_weights
 
 
-class Genome():
-    def __init__(self, weights=None):
-        self.layer_sizes = [len(SENSOR_ANGLES), NUM_HIDDEN_NEURONS, 2] # size of each layer of neural network
-        self.num_weights = (self.layer_sizes[0] * self.layer_sizes[1]) + (self.layer_sizes[1] * self.layer_sizes[2])
+rng = np.random.default_rng(SEED) # shared by all genome operators (reseed with seed())
+KEY_SIZE = hashlib.sha1().digest_size # bytes of a genome key
+
+
+def seed(value):
+    # reset state in place, so modules holding the generator see the new seed
+    rng.bit_generator.state = np.random.default_rng(value).bit_generator.state
 
-        if weights: # assign weights if provided
-            self.weights = weights
+
+class Genome():
+    def __init__(self, weights=None, config:Config=None):
+        self.config = config if config is not None else Config()
+        if weights is not None: # assign weights if provided (may be a row of a population matrix)
+            self.weights = np.asarray(weights, dtype=np.float64)
         else: # random weights if not provided
             self.weights = self.random_weights()
 
 
+    @property
+    def layer_sizes(self):
+        return network_layer_sizes(self.config) # size of each layer of neural network
+
+
+    @property
+    def num_weights(self):
+        return count_weights(self.layer_sizes, self.config.USE_BIASES) # weights (and biases) of all layers
+
+
     def random_weights(self):
-        rand_weights = [random.uniform(-1, 1) for _ in range(self.num_weights)]
-        return rand_weights
+        return random_genomes(1, self.num_weights)[0]
 
 
-    def crossover(self, genome):
-        # average weights of parents
-        child_weights = []
-        for i in range(self.num_weights):
-            child_weight = (self.weights[i] + genome.weights[i]) / 2
-            child_weights.append(child_weight)
-        
-        child_genome = Genome(child_weights) # create child's genome with crossover weights
-        return child_genome
+    def crossover(self, genome, method=None):
+        child_weights = crossover_genomes(self.weights[None], genome.weights[None], method, self.config)
+        return Genome(child_weights[0], self.config) # create child's genome with crossover weights
 
 
     def mutate(self, best_fitness, generation):
-        # exponential decay based on generation
-        mutation_mag = INITIAL_MUT_MAG * math.exp(-DECAY_RATE * generation)
-
-        # scale inversely to fitness
-        fitness_factor = max(0.1, 1.0 / (1.0 + best_fitness * FITNESS_SCALE))
-        mutation_mag *= fitness_factor
-
-        for i in range(self.num_weights):
-            if random.random() < MUT_RATE: # mutate random number of weights
-                random_mutation = random.gauss(0, mutation_mag)
-                new_weight = self.weights[i] + random_mutation
-                self.weights[i] = max(-MAX_WEIGHT, min(MAX_WEIGHT, new_weight)) # make sure weights don't exceed max threshold
\ No newline at end of file
+        mutation_mag = mutation_magnitude(best_fitness, generation, self.config)
+        return mutate_genomes(self.weights[None], mutation_mag, self.config) # mutates weights in place, returns magnitude
+
+
+######################################################################################
+# Population operators (rows of weights matrices are genomes)
+######################################################################################
+
+def genome_keys(weights):
+    # identical weights give identical keys
+    return [hashlib.sha1(row.tobytes()).digest() for row in np.ascontiguousarray(weights, dtype=np.float64)]
+
+
+def random_genomes(num_genomes, num_weights):
+    return rng.uniform(-1, 1, (num_genomes, num_weights))
+
+
+def sample_parents(num_parents, num_children):
+    # two different parents per child (same as random.sample(parents, 2) for every child)
+    first = rng.integers(0, num_parents, num_children)
+    second = rng.integers(0, num_parents - 1, num_children)
+    second += second >= first # skip over first parent
+    return first, second
+
+
+def crossover_genomes(first, second, method=None, config:Config=None):
+    # method None = config.CROSSOVER
+    config = config if config is not None else Config()
+    method = method or config.CROSSOVER
+    if method == "average": # average weights of parents
+        return (first + second) / 2
+    if method == "uniform": # every weight taken from either parent
+        return np.where(rng.random(first.shape) < 0.5, first, second)
+    if method == "blend": # uniform sample from parents' range widened by BLEND_ALPHA on both sides
+        low = np.minimum(first, second)
+        spread = np.abs(first - second)
+        return low + rng.uniform(-config.BLEND_ALPHA, 1 + config.BLEND_ALPHA, first.shape) * spread
+    raise ValueError(f"unknown crossover method: {method}")
+
+
+def mutation_magnitude(best_fitness, generation, config:Config=None):
+    config = config if config is not None else Config()
+
+    # exponential decay based on generation
+    mutation_mag = config.INITIAL_MUT_MAG * math.exp(-config.DECAY_RATE * generation)
+
+    # scale inversely to fitness
+    fitness_factor = max(0.1, 1.0 / (1.0 + best_fitness * config.FITNESS_SCALE))
+    return mutation_mag * fitness_factor
+
+
+def mutate_genomes(weights, mutation_mag, config:Config=None):
+    # mutate random number of weights of every genome in place
+    config = config if config is not None else Config()
+    mask = rng.random(weights.shape) < config.MUT_RATE
+    weights += mask * rng.normal(0, mutation_mag, weights.shape)
+    np.clip(weights, -config.MAX_WEIGHT, config.MAX_WEIGHT, out=weights) # make sure weights don't exceed max threshold
+    return mutation_mag
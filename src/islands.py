@@ -0,0 +1,183 @@
+"""
+file for island model genetic algorithm
+tasks:
+1. running independent populations (islands), each in its own process
+2. migrating the best genomes between islands (ring or fully connected topology)
+3. reporting per-island and global best fitness
+4. overriding runtime settings of every island from the command line (--set NAME=VALUE)
+"""
+import argparse
+import multiprocessing
+import random
+import time
+from settings import *
+from config import Config, parse_overrides
+from environment import Environment
+from population import Population
+from genome import Genome, seed as seed_genomes
+from evaluation import SerialEvaluator, SuccessiveHalving
+
+
+######################################################################################
+# Island process
+######################################################################################
+
+def _island_worker(conn, seed, config):
+    seed_genomes(seed) # forked processes share the parent's random state
+    evaluator = SerialEvaluator(Environment(config=config))
+    pop = Population(config=config)
+    if pop.config.HALVING_ROUNDS:
+        pop.screening = SuccessiveHalving(evaluator.env, pop.config)
+    best_fitness = 0
+    best_distance = 0
+
+    while True:
+        command, data = conn.recv()
+
+        if command == "run": # run generations, send back best results and emigrants of last generation
+            for gen_i in range(data["generations"]):
+                pop.evaluate(evaluator)
+                best_fitness = max(best_fitness, pop.best_agents[0].fitness)
+                best_distance = max(best_distance, pop.furthest_agents[0].distance)
+
+                if gen_i == data["generations"] - 1:
+                    order = pop.state.fitnesses.argsort()[::-1][:data["num_migrants"]]
+                    emigrants = [(float(pop.state.fitnesses[i]), pop.weights[i].tolist()) for i in order]
+                pop.evolve()
+
+            conn.send({
+                "generation": pop.generation,
+                "best_fitness": best_fitness,
+                "best_distance": best_distance,
+                "emigrants": emigrants
+            })
+
+        elif command == "immigrate": # replace part of the next generation with genomes of other islands
+            pop.add_immigrants([Genome(weights, pop.config) for weights in data])
+            conn.send(None)
+
+        elif command == "stop":
+            conn.close()
+            return
+
+
+######################################################################################
+# Island model
+######################################################################################
+
+class IslandModel():
+    def __init__(self, num_islands=NUM_ISLANDS, topology=MIGRATION_TOPOLOGY, interval=MIGRATION_INTERVAL, num_migrants=NUM_MIGRANTS, seed=None,
+                 config:Config=None):
+        if topology not in ("ring", "full"):
+            raise ValueError(f"unknown migration topology: {topology}")
+        if interval < 1:
+            raise ValueError(f"migration interval must be at least 1 generation, got {interval}")
+
+        self.num_islands = num_islands
+        self.topology = topology
+        self.interval = interval
+        self.num_migrants = num_migrants
+        self.config = config if config is not None else Config() # settings of every island
+        self.generations = 0
+        self.best_fitnesses = [0] * num_islands # best fitness of each island so far
+        self.best_distances = [0] * num_islands
+
+        # start island processes
+        rng = random.Random(seed)
+        self.connections = []
+        self.processes = []
+        for _ in range(num_islands):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_island_worker, args=(child_conn, rng.getrandbits(64), self.config), daemon=True)
+            process.start()
+            self.connections.append(parent_conn)
+            self.processes.append(process)
+
+
+    def run(self, max_generations=NUM_GEN, max_seconds=None, verbose=True):
+        start_time = time.perf_counter()
+
+        while self.generations < max_generations:
+            num_generations = min(self.interval, max_generations - self.generations)
+            for conn in self.connections:
+                conn.send(("run", {"generations": num_generations, "num_migrants": self.num_migrants}))
+            results = [conn.recv() for conn in self.connections]
+
+            self.generations += num_generations
+            for i, result in enumerate(results):
+                self.best_fitnesses[i] = result["best_fitness"]
+                self.best_distances[i] = result["best_distance"]
+            if verbose:
+                self.report()
+
+            if max_seconds is not None and time.perf_counter() - start_time >= max_seconds:
+                break
+            if self.generations < max_generations:
+                self.migrate([result["emigrants"] for result in results])
+
+        return {
+            "generations": self.generations,
+            "seconds": time.perf_counter() - start_time,
+            "island_best_fitness": list(self.best_fitnesses),
+            "global_best_fitness": max(self.best_fitnesses),
+            "global_best_distance": max(self.best_distances)
+        }
+
+
+    def migrate(self, emigrants):
+        # emigrants: list of (fitness, weights) of each island, best first
+        if self.num_migrants == 0 or self.num_islands < 2:
+            return
+
+        for i, conn in enumerate(self.connections):
+            if self.topology == "ring": # receive from previous island
+                immigrants = emigrants[i - 1]
+            else: # receive best migrants of all other islands
+                candidates = [migrant for j, island in enumerate(emigrants) if j != i for migrant in island]
+                immigrants = sorted(candidates, key=lambda migrant: migrant[0], reverse=True)[:self.num_migrants]
+            conn.send(("immigrate", [weights for _, weights in immigrants]))
+
+        for conn in self.connections:
+            conn.recv() # wait for islands to add immigrants
+
+
+    def report(self):
+        islands = ", ".join(f"{fitness:.3f}" for fitness in self.best_fitnesses)
+        print(f"Generation {self.generations}: global best fitness {max(self.best_fitnesses):.3f}, "
+              f"best distance {max(self.best_distances):.0f} (islands: {islands})")
+
+
+    def close(self):
+        for conn in self.connections:
+            conn.send(("stop", None))
+        for process in self.processes:
+            process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="train independent populations with periodic migration")
+    parser.add_argument("--islands", type=int, default=NUM_ISLANDS, help="number of islands (processes)")
+    parser.add_argument("--generations", type=int, default=NUM_GEN, help="generations per island")
+    parser.add_argument("--seconds", type=float, default=None, help="wall-clock budget in seconds")
+    parser.add_argument("--topology", choices=("ring", "full"), default=MIGRATION_TOPOLOGY, help="migration topology")
+    parser.add_argument("--interval", type=int, default=MIGRATION_INTERVAL, help="generations between migrations")
+    parser.add_argument("--migrants", type=int, default=NUM_MIGRANTS, help="genomes sent by each island per migration")
+    parser.add_argument("--seed", type=int, default=None, help="seed for island random states")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE", help="override a runtime setting of every island (e.g. --set POP_SIZE=50)")
+    args = parser.parse_args()
+    if args.interval < 1:
+        parser.error("--interval must be at least 1")
+    try:
+        config = Config(**parse_overrides(args.set))
+    except ValueError as e:
+        parser.error(str(e))
+
+    model = IslandModel(args.islands, args.topology, args.interval, args.migrants, args.seed, config)
+    stats = model.run(args.generations, args.seconds)
+    model.close()
+    print(f"{stats['generations']} generations on {args.islands} islands in {stats['seconds']:.2f}s, "
+          f"global best fitness {stats['global_best_fitness']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
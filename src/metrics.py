@@ -0,0 +1,178 @@
+"""
+file for per-generation metrics log
+tasks:
+1. summarizing a finished generation (fitness and distance statistics, mutation magnitude, ticks, wall time)
+2. writing records to a jsonl or csv file on a background thread (buffered, so training never waits on disk)
+3. rotating to a new part file once METRICS_MAX_BYTES are written
+4. continuing an existing log when training is resumed (records of generations that are simulated again are dropped)
+5. reading all parts of a log back lazily, one record at a time
+"""
+import argparse
+import csv
+import json
+import os
+import queue
+import threading
+import numpy as np
+from settings import *
+from atomic_file import atomic_write
+
+FIELDS = ["generation", "best_fitness", "mean_fitness", *(f"p{p}_fitness" for p in METRICS_PERCENTILES),
+          "best_distance", "mean_distance", *(f"p{p}_distance" for p in METRICS_PERCENTILES),
+          "mutation_mag", "ticks", "simulated", "screened", "seconds"]
+
+
+def generation_record(generation, fitnesses, distances, mutation_mag, ticks, simulated, seconds, screened=0):
+    # compact summary of a finished generation (plain python types, so it can be serialized)
+    record = {"generation": int(generation)}
+    for name, values in (("fitness", fitnesses), ("distance", distances)):
+        record[f"best_{name}"] = float(values.max())
+        record[f"mean_{name}"] = float(values.mean())
+        for percentile, value in zip(METRICS_PERCENTILES, np.percentile(values, METRICS_PERCENTILES)):
+            record[f"p{percentile}_{name}"] = float(value)
+    record["mutation_mag"] = float(mutation_mag)
+    record["ticks"] = int(ticks)
+    record["simulated"] = int(simulated) # genomes that weren't restored from the fitness cache
+    record["screened"] = int(screened) # candidates for the next generation screened with successive halving
+    record["seconds"] = float(seconds)
+    return record
+
+
+def part_path(path, part):
+    return path if part == 0 else f"{path}.{part}" # metrics.jsonl, metrics.jsonl.1, ...
+
+
+class MetricsWriter():
+    def __init__(self, path, max_bytes=METRICS_MAX_BYTES, resume_from=None):
+        # resume_from: first generation that is simulated again (None = start a new log)
+        self.path = path
+        self.csv = path.endswith(".csv")
+        self.max_bytes = max_bytes
+        self.part = 0
+        self.file = None
+        self.writer = None # csv writer (None for jsonl)
+        if resume_from is None:
+            remove_parts(path) # a new log replaces an old one
+        else:
+            self.part = self._truncate(resume_from)
+        self._open_part()
+
+        self.records = queue.SimpleQueue() # training loop only puts records here
+        self.thread = threading.Thread(target=self._run, name="metrics writer", daemon=True)
+        self.thread.start()
+
+
+    def write(self, record):
+        self.records.put(record)
+
+
+    def close(self):
+        # write remaining records and wait for the writer thread
+        self.records.put(None)
+        self.thread.join()
+        self.file.close()
+
+
+    def _run(self):
+        while True:
+            try:
+                record = self.records.get(timeout=METRICS_FLUSH_INTERVAL)
+            except queue.Empty:
+                self.file.flush() # idle: make records visible to readers of a running log
+                continue
+            if record is None:
+                return
+
+            if self.csv:
+                self.writer.writerow(record)
+            else:
+                self.file.write(json.dumps(record) + "\n")
+            if self.max_bytes and self.file.tell() >= self.max_bytes:
+                self.file.close()
+                self.part += 1
+                self._open_part()
+
+
+    def _open_part(self):
+        # appends to an existing part (resumed log)
+        self.file = open(part_path(self.path, self.part), "a", newline="", buffering=1 << 16)
+        if self.csv:
+            self.writer = csv.DictWriter(self.file, fieldnames=FIELDS, extrasaction="ignore")
+            if self.file.tell() == 0:
+                self.writer.writeheader()
+
+
+    def _truncate(self, generation):
+        # drop records from generation on (written after the checkpoint was saved), returns last remaining part
+        part = 0
+        while os.path.exists(part_path(self.path, part + 1)):
+            part += 1
+
+        while os.path.exists(part_path(self.path, part)):
+            records = list(_read_part(self.path, part))
+            kept = [record for record in records if record["generation"] < generation]
+            if not kept and part > 0: # also removes the empty part opened after the last rotation
+                os.remove(part_path(self.path, part))
+                part -= 1
+                continue
+            if len(kept) == len(records):
+                break
+
+            with atomic_write(part_path(self.path, part), "w", newline="") as file:
+                if self.csv:
+                    writer = csv.DictWriter(file, fieldnames=FIELDS, extrasaction="ignore")
+                    writer.writeheader()
+                    writer.writerows(kept)
+                else:
+                    file.writelines(json.dumps(record) + "\n" for record in kept)
+            break
+        return part
+
+
+def _parse(value):
+    # csv values back to int or float
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def _read_part(path, part):
+    with open(part_path(path, part), newline="") as file:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(file):
+                yield {key: _parse(value) for key, value in row.items()}
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def read_metrics(path):
+    # generator over records of all parts of a log, in order
+    part = 0
+    while os.path.exists(part_path(path, part)):
+        yield from _read_part(path, part)
+        part += 1
+
+
+def remove_parts(path):
+    part = 0
+    while os.path.exists(part_path(path, part)):
+        os.remove(part_path(path, part))
+        part += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="print columns of a metrics log as tab separated values (e.g. for plotting)")
+    parser.add_argument("path", help="metrics log written by trainer.py --metrics")
+    parser.add_argument("--columns", nargs="+", default=["generation", "best_fitness", "mean_fitness", "best_distance"], choices=FIELDS)
+    args = parser.parse_args()
+
+    print("\t".join(args.columns))
+    for record in read_metrics(args.path):
+        print("\t".join(str(record[column]) for column in args.columns))
+
+
+if __name__ == "__main__":
+    main()
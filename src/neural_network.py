@@ -1,43 +1,108 @@
 """
-file for neural network class
+file for neural network classes
 tasks:
 1. processing inputs via feedforward network
 2. normalization using activation function
+3. batched feedforward of the whole population (one matrix multiply per layer)
+4. compiling flat genomes into weight and bias matrices of any layer sizes
 """
 from settings import *
-import math
+from config import Config
+import numpy as np
+
+ACTIVATIONS = {
+    "tanh": np.tanh, # range (-1, 1), doesn't overflow for large sums
+    "relu": lambda x: np.maximum(x, 0),
+    "sigmoid": lambda x: 0.5 * (np.tanh(0.5 * x) + 1), # logistic function without overflow
+    "linear": lambda x: x
+}
+
+
+def network_layer_sizes(config:Config=None):
+    config = config if config is not None else Config()
+    return [len(config.SENSOR_ANGLES), *config.HIDDEN_LAYERS, 2] # sensors in, speed and turn rate out
+
+
+def count_weights(layer_sizes, biases=USE_BIASES):
+    return sum(inp * out + (out if biases else 0) for inp, out in zip(layer_sizes[:-1], layer_sizes[1:]))
+
+
+def layer_activations(num_layers, config:Config=None):
+    config = config if config is not None else Config()
+    for name in (config.HIDDEN_ACTIVATION, config.OUTPUT_ACTIVATION):
+        if name not in ACTIVATIONS:
+            raise ValueError(f"unknown activation: {name}")
+    return [ACTIVATIONS[config.HIDDEN_ACTIVATION]] * (num_layers - 1) + [ACTIVATIONS[config.OUTPUT_ACTIVATION]]
+
+
+def compile_layers(weights, layer_sizes, biases=USE_BIASES):
+    # split flat genomes (one per row) into (num_genomes, input_size, output_size) weights and (num_genomes, output_size) biases per layer
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    if weights.shape[1] != count_weights(layer_sizes, biases):
+        raise ValueError(f"genome has {weights.shape[1]} weights, layer sizes {layer_sizes} need {count_weights(layer_sizes, biases)}")
+
+    layers = []
+    idx = 0
+    for input_size, output_size in zip(layer_sizes[:-1], layer_sizes[1:]):
+        layer_weights = weights[:, idx:idx + input_size * output_size] # flat order is [output node][input node]
+        idx += input_size * output_size
+        layer_weights = np.ascontiguousarray(layer_weights.reshape(-1, output_size, input_size).transpose(0, 2, 1))
+
+        layer_biases = None
+        if biases:
+            layer_biases = np.ascontiguousarray(weights[:, idx:idx + output_size])
+            idx += output_size
+
+        layers.append((layer_weights, layer_biases))
+
+    return layers
 
 
 class NeuralNetwork:
-    def __init__(self, layer_sizes, weights):
+    def __init__(self, layer_sizes, weights, config:Config=None):
+        config = config if config is not None else Config()
         self.layer_sizes = layer_sizes # size of each layer
         self.weights = weights
 
+        # (input_size, output_size) weights and (output_size) biases of every layer, compiled once
+        self.layers = [(layer_weights[0], None if layer_biases is None else layer_biases[0])
+                       for layer_weights, layer_biases in compile_layers(weights, layer_sizes, config.USE_BIASES)]
+        self.activations = layer_activations(len(self.layers), config)
 
-    def feedforward(self, inputs:list):
-        idx = 0
-        current_layer = inputs.copy() # current layer being calculated
 
-        for layer_i in range(len(self.layer_sizes) - 1): # iterate through layers
-            next_layer = []
-            input_size = self.layer_sizes[layer_i] # current layer size
-            output_size = self.layer_sizes[layer_i + 1] # next layer size
+    def feedforward(self, inputs):
+        current_layer = np.asarray(inputs, dtype=np.float64) # current layer being calculated
 
-            for out_i in range(output_size): # iterate through each next layer node
-                total = 0
+        for (layer_weights, layer_biases), activate in zip(self.layers, self.activations):
+            current_layer = current_layer @ layer_weights # weighted sums of next layer nodes
+            if layer_biases is not None:
+                current_layer += layer_biases
+            current_layer = activate(current_layer)
 
-                for inp_i in range(input_size): # iterate through each current node
-                    total += current_layer[inp_i] * self.weights[idx] # weight output sum for next layer node
-                    idx += 1
+        return current_layer
 
-                activated_total = self.activate(total)
-                next_layer.append(activated_total)
 
-            current_layer = next_layer
+class BatchNeuralNetwork:
+    def __init__(self, layer_sizes, weights_list, config:Config=None):
+        config = config if config is not None else Config()
+        self.layer_sizes = layer_sizes
+        weights = np.asarray(weights_list, dtype=np.float64).reshape(len(weights_list), -1) # one row of weights per agent
+
+        # one (num_agents, input_size, output_size) weight tensor and (num_agents, output_size) bias matrix per layer
+        self.layers = compile_layers(weights, layer_sizes, config.USE_BIASES)
+        self.activations = layer_activations(len(self.layers), config)
 
-        return current_layer
 
+    def feedforward(self, inputs, indices=None):
+        # inputs: (num_rows, input_size), indices: network row of each input row (None = every agent in order)
+        current_layer = np.asarray(inputs, dtype=np.float64)
 
-    def activate(self, sum):
-        tanh = (math.exp(sum) - math.exp(-sum)) / (math.exp(sum) + math.exp(-sum)) # activate total using tanh (range: (-1, 1))
-        return tanh
\ No newline at end of file
+        for (layer_weights, layer_biases), activate in zip(self.layers, self.activations):
+            if indices is not None:
+                layer_weights = layer_weights[indices]
+            current_layer = np.matmul(current_layer[:, None, :], layer_weights)[:, 0, :] # batched vector-matrix product
+            if layer_biases is not None:
+                current_layer += layer_biases if indices is None else layer_biases[indices]
+            current_layer = activate(current_layer)
+
+        return current_layer
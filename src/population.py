@@ -1,55 +1,208 @@
 """
 population class
 tasks:
-1. initializing generation of agents
+1. initializing generation of agents (random, or warm started from archived genomes)
 2. updating all agents
 3. selecting parents based on fitness
 4. evolving population
 5. determining population status 
+6. evaluating a whole generation with an evaluator (e.g. process pool)
+7. carrying elites forward and reusing results of already simulated genomes
+8. appending a metrics record per generation (if a metrics writer is attached)
+9. tracking the best genome so far and converting state to arrays and back (checkpoints)
+10. screening a larger pool of offspring before the next generation (if successive halving is attached)
 """
+import time
 
 from settings import *
+from config import Config
 from agent import Agent
-from genome import Genome
-import random
+from agent_state import AgentState
+from genome import Genome, genome_keys, random_genomes, sample_parents, crossover_genomes, mutation_magnitude, mutate_genomes
+from neural_network import BatchNeuralNetwork, network_layer_sizes, count_weights
+from fitness_cache import FitnessCache
+from metrics import generation_record
+from profiler import profiler
+import numpy as np
+
+
+def top_indices(values, k):
+    # indices of the k largest values, largest first (ties in index order, like a stable sort of the whole array)
+    if k <= 0:
+        return np.zeros(0, dtype=np.intp)
+    if k >= len(values):
+        return np.argsort(-values, kind="stable")
+    threshold = values[np.argpartition(-values, k - 1)[:k]].min() # k-th largest value
+    above = np.flatnonzero(values > threshold)
+    ties = np.flatnonzero(values == threshold)[:k - len(above)] # lowest indices of ties at the threshold
+    chosen = np.concatenate([above, ties])
+    return chosen[np.lexsort((chosen, -values[chosen]))]
 
 
 class Population:
-    def __init__(self):
+    def __init__(self, size=None, warm_start=None, warm_start_mutation=None, config:Config=None):
+        self.config = config if config is not None else Config()
         self.generation = 1
-        self.agents = [Agent(Genome()) for _ in range(POP_SIZE)] # create initial generation
+        self.size = size or self.config.POP_SIZE # number of agents per generation
+        self.layer_sizes = network_layer_sizes(self.config)
+        self.num_weights = count_weights(self.layer_sizes, self.config.USE_BIASES)
+        self.fitness_cache = FitnessCache(self.config.FITNESS_CACHE_SIZE) if self.config.FITNESS_CACHE_SIZE else None # results of simulated genomes
+        self.metrics = None # metrics writer, receives a record per generation
+        self.screening = None # successive halving, picks offspring from a larger candidate pool
+        self.best_fitness = 0.0 # best of all generations so far
+        self.best_distance = 0.0
+        self.best_weights = None
+        self.generation_start = time.perf_counter()
+        if warm_start_mutation is None:
+            warm_start_mutation = self.config.WARM_START_MUTATION
+        self._spawn(self.initial_genomes(warm_start, warm_start_mutation)) # create initial generation
+
+
+    def initial_genomes(self, warm_start, mutation_mag):
+        # random genomes, or (k, num_weights) warm start genomes followed by their mutated copies
+        weights = random_genomes(self.size, self.num_weights)
+        if warm_start is None or np.size(warm_start) == 0: # empty archive, any shape
+            return weights
+        if np.shape(warm_start)[1] != self.num_weights:
+            raise ValueError(f"warm start genomes have {np.shape(warm_start)[1]} weights, network needs {self.num_weights}")
+
+        warm_start = np.asarray(warm_start, dtype=np.float64)[:self.size]
+        weights[:len(warm_start)] = warm_start # unchanged
+        if mutation_mag:
+            copies = weights[len(warm_start):] # view, mutated in place
+            copies[:] = warm_start[np.arange(len(copies)) % len(warm_start)]
+            mutate_genomes(copies, mutation_mag, self.config)
+        return weights
+
+
+    def _spawn(self, weights):
+        self.weights = np.ascontiguousarray(weights, dtype=np.float64) # one row per genome
+        self.state = AgentState(len(self.weights), self.config) # array-backed state of the whole generation
+        self.agents = [Agent(Genome(row, self.config), i, self.state) for i, row in enumerate(self.weights)] # views in state order
+        self.network = BatchNeuralNetwork(self.layer_sizes, self.weights, self.config) # stack genomes for batched inference
+
+        # genomes simulated before start the generation dead with their recorded result
+        self.cached = np.zeros(len(self.weights), dtype=bool)
+        if self.fitness_cache is not None:
+            self.genome_keys = genome_keys(self.weights)
+            self.cached = self.fitness_cache.restore(self.genome_keys, self.state)
 
 
     def update_agents(self, env, screen, iterations):
-        self.fitnesses = []
-        for i in range(POP_SIZE):
-            self.agents[i].update(env, screen, iterations)
-            self.fitnesses.append(self.agents[i].fitness)
+        self.state.step(env, self.network, iterations) # vectorized step of all live agents
+
+        if profiler.enabled:
+            start = profiler.lap()
+        self.fitnesses = self.state.fitnesses
+        self.select() # determine best agents
+        if profiler.enabled:
+            profiler.lap("selection", start)
+
+
+    def evaluate(self, evaluator):
+        # run the whole generation to completion at once, returns episode length in ticks
+        pending = np.nonzero(~self.cached)[0]
+        if len(pending):
+            # identical genomes are only simulated once
+            unique_weights, inverse = np.unique(self.weights[pending], axis=0, return_inverse=True)
+            fitnesses, distances, ticks, end_reasons = evaluator.evaluate(unique_weights, self.config)
+            inverse = inverse.reshape(-1)
 
+            self.state.fitnesses[pending] = fitnesses[inverse]
+            self.state.distances[pending] = distances[inverse]
+            self.state.ticks[pending] = ticks[inverse]
+            self.state.end_reasons[pending] = end_reasons[inverse]
+        self.state.alive[:] = False
+
+        self.fitnesses = self.state.fitnesses
         self.select() # determine best agents
+        return int(self.state.ticks[pending].max()) if len(pending) else 0 # cached genomes weren't simulated
+
+
+    def add_immigrants(self, genomes):
+        # replace the last agents of the (not yet simulated) generation with genomes from elsewhere
+        weights = self.weights.copy()
+        weights[len(weights) - len(genomes):] = [genome.weights for genome in genomes]
+        self._spawn(weights)
 
 
     def all_dead(self):
-        return all(not agent.alive for agent in self.agents)
+        return not self.state.alive.any()
 
 
     def evolve(self):
+        if profiler.enabled:
+            start = profiler.lap()
         self.select() # select best agents from generation
-        
-        offspring = []
-        for _ in range(POP_SIZE):
-            parents = random.sample(self.best_agents, 2) # select 2 random parents
-            child_genome = parents[0].genome.crossover(parents[1].genome) # crossover genes
-            child_genome.mutate(self.best_agents[0].fitness, self.generation) # create random mutation in genes
-            offspring.append(Agent(child_genome))
+        if self.fitness_cache is not None:
+            self.fitness_cache.store(self.genome_keys, self.state, np.nonzero(~self.cached)[0]) # remember results of simulated genomes
+
+        best = self.best_indices[0]
+        if self.best_weights is None or self.state.fitnesses[best] > self.best_fitness:
+            self.best_fitness = float(self.state.fitnesses[best])
+            self.best_weights = self.weights[best].copy()
+        self.best_distance = max(self.best_distance, float(self.state.distances.max()))
+
+        # whole offspring matrix at once (one row per child)
+        num_elites = min(self.config.ELITISM, self.size)
+        num_children = self.size - num_elites
+        num_candidates = self.screening.pool_size(num_children) if self.screening is not None else num_children
+        parents = self.weights[self.best_indices]
+        first, second = sample_parents(len(parents), num_candidates) # 2 different random parents per child
+        children = crossover_genomes(parents[first], parents[second], config=self.config) # crossover genes
+        mutation_mag = mutation_magnitude(self.best_agents[0].fitness, self.generation, self.config)
+        mutate_genomes(children, mutation_mag, self.config) # create random mutation in genes
+        if self.screening is not None and num_children: # only candidates that survive short episodes get a full one
+            children = children[self.screening.screen(children, num_children)]
+
+        # fittest genomes carried forward unchanged (first rows, immigrants replace the last ones)
+        elites = self.weights[top_indices(self.state.fitnesses, num_elites)]
+        offspring = np.concatenate([elites, children])
+
+        if self.metrics is not None: # writer thread serializes the record
+            now = time.perf_counter()
+            self.metrics.write(generation_record(self.generation, self.state.fitnesses, self.state.distances, mutation_mag,
+                                                 self.state.ticks.max(), np.count_nonzero(~self.cached), now - self.generation_start,
+                                                 num_candidates if self.screening is not None else 0))
+            self.generation_start = now
 
         # replace generation
-        self.agents = offspring
+        self._spawn(offspring)
         self.generation += 1
+        if profiler.enabled:
+            profiler.lap("evolution", start)
+
+
+    def checkpoint(self):
+        # arrays needed to continue with the (not yet simulated) current generation (fitness cache is saved separately)
+        return {
+            "weights": self.weights.copy(),
+            "generation": np.array(self.generation),
+            "size": np.array(self.size),
+            "best_fitness": np.array(self.best_fitness),
+            "best_distance": np.array(self.best_distance),
+            "best_weights": self.best_weights.copy() if self.best_weights is not None else np.zeros(0)
+        }
+
+
+    def restore(self, arrays):
+        if arrays["weights"].shape[1] != self.num_weights:
+            raise ValueError(f"checkpoint has {arrays['weights'].shape[1]} weights per genome, network needs {self.num_weights}")
+
+        self.generation = int(arrays["generation"])
+        self.size = int(arrays["size"])
+        self.best_fitness = float(arrays["best_fitness"])
+        self.best_distance = float(arrays["best_distance"])
+        self.best_weights = arrays["best_weights"].copy() if len(arrays["best_weights"]) else None
+        if self.fitness_cache is not None and "cache_keys" in arrays:
+            self.fitness_cache.from_arrays({name[6:]: array for name, array in arrays.items() if name.startswith("cache_")})
+        self._spawn(arrays["weights"]) # cached genomes are restored again
 
 
     def select(self):
-        self.agents.sort(key=lambda agent: agent.fitness, reverse=True) # sort by fitness
-        self.best_agents = self.agents[:NUM_PARENTS]
+        # only the top agents are extracted and sorted, so agents stay in state order
+        self.best_indices = top_indices(self.state.fitnesses, self.config.NUM_PARENTS) # by fitness
+        self.best_agents = [self.agents[i] for i in self.best_indices]
 
-        self.furthest_agents = sorted(self.agents, key=lambda agent: agent.distance, reverse=True) # sort by distance (for camera offset)
\ No newline at end of file
+        furthest = top_indices(self.state.distances, self.config.NUM_PARENTS) # by distance (for camera offset)
+        self.furthest_agents = [self.agents[i] for i in furthest]
\ No newline at end of file
@@ -0,0 +1,97 @@
+"""
+file for profiler class
+tasks:
+1. timing each phase of a tick (sensing, inference, motion, collision, selection, evolution, rendering)
+2. counting ray steps and mask overlap tests
+3. streaming per-tick records to a csv or jsonl file
+4. drawing phase times as an overlay
+"""
+import csv
+import json
+import time
+import pygame
+from settings import *
+
+PHASES = ("sensing", "inference", "motion", "collision", "selection", "evolution", "rendering")
+COUNTERS = ("ray_steps", "mask_tests")
+
+
+class Profiler():
+    def __init__(self):
+        # call sites check enabled before timing, so a disabled profiler costs one attribute lookup per phase
+        self.enabled = PROFILE
+        self.times = dict.fromkeys(PHASES, 0.0) # seconds spent in each phase during current tick
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.averages = dict.fromkeys(PHASES + COUNTERS, 0.0) # smoothed per tick values for overlay
+
+        self.file = None
+        self.writer = None # csv writer (None for jsonl)
+
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        self.reset()
+
+
+    def lap(self, phase=None, start=None):
+        # add time since start to phase, returns current time as start of next phase
+        now = time.perf_counter()
+        if phase is not None:
+            self.times[phase] += now - start
+        return now
+
+
+    def count(self, counter, amount=1):
+        self.counts[counter] += amount
+
+
+    def reset(self):
+        for phase in PHASES:
+            self.times[phase] = 0.0
+        for counter in COUNTERS:
+            self.counts[counter] = 0
+
+
+    def end_tick(self, generation, tick):
+        # write record of finished tick and start the next one
+        record = {"generation": generation, "tick": tick}
+        record.update({phase: self.times[phase] * 1000 for phase in PHASES}) # milliseconds
+        record.update(self.counts)
+
+        for key in self.averages:
+            self.averages[key] += (record[key] - self.averages[key]) * PROFILE_SMOOTHING
+
+        if self.file is not None:
+            if self.writer is not None:
+                self.writer.writerow(record)
+            else:
+                self.file.write(json.dumps(record) + "\n")
+        self.reset()
+
+
+    def open(self, path):
+        # stream records to path (.csv or .jsonl)
+        self.close()
+        self.file = open(path, "w", newline="")
+        if path.endswith(".csv"):
+            self.writer = csv.DictWriter(self.file, fieldnames=["generation", "tick", *PHASES, *COUNTERS])
+            self.writer.writeheader()
+
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+        self.file = None
+        self.writer = None
+
+
+    def draw(self, screen:pygame.Surface, font):
+        # overlay in top right corner (smoothed values per tick)
+        lines = [f"{phase}: {self.averages[phase]:.2f} ms" for phase in PHASES]
+        lines += [f"{counter}: {self.averages[counter]:.0f}" for counter in COUNTERS]
+        for i, line in enumerate(lines):
+            text = font.render(line, True, TEXT_COLOR)
+            screen.blit(text, (SCREEN_WIDTH - 220, 10 + i * 20))
+
+
+profiler = Profiler() # shared by all modules
@@ -0,0 +1,114 @@
+"""
+file for renderer class
+tasks:
+1. opening the window and handling window events
+2. drawing agents, track and text every TICKS_PER_FRAME ticks
+3. keeping frame rate at FPS (unless unthrottled)
+4. following the furthest agent with the camera
+5. fast-forward controls (+/- ticks per frame, U unthrottle, 0-9 top-k agents)
+"""
+import pygame
+from settings import *
+from trainer import Observer
+from population import top_indices
+from profiler import profiler
+
+
+class Renderer(Observer):
+    def __init__(self):
+        pygame.init()
+        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT)) # create window object
+        pygame.display.set_caption("Cars")
+        self.clock = pygame.time.Clock() # initialize clock to manage frame rate
+        self.font = pygame.font.SysFont(None, 25)
+        self.camera_offset = pygame.Vector2(0, 0)
+
+        self.ticks_per_frame = TICKS_PER_FRAME # simulation ticks between rendered frames
+        self.unthrottled = UNTHROTTLED # don't wait for FPS between frames
+        self.top_k = RENDER_TOP_K # number of fittest agents drawn (0 = all)
+        self.skipped_ticks = 0 # ticks since last rendered frame
+        self.status_surface = None # rendered controls text (None = needs update)
+
+
+    def on_tick(self, trainer):
+        # fast-forward (only render every ticks_per_frame ticks)
+        self.skipped_ticks += 1
+        if self.skipped_ticks < self.ticks_per_frame:
+            return
+        self.skipped_ticks = 0
+
+        # events (user input)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT: # check if program is quit
+                trainer.stop()
+            elif event.type == pygame.KEYDOWN: # check if key is pressed
+                self.handle_key(event.key)
+
+        if profiler.enabled:
+            start = profiler.lap()
+        pop = trainer.pop
+        self.update_camera(pop)
+
+        # render (display screen)
+        self.screen.fill(BG_COLOR) # fill background gray
+        for agent in self.visible_agents(pop):
+            agent.draw(self.screen, self.camera_offset)
+        trainer.env.draw(self.screen, self.font, pop, self.camera_offset)
+        self.draw_status()
+        if profiler.enabled:
+            profiler.draw(self.screen, self.font)
+
+        pygame.display.flip()
+        if profiler.enabled:
+            profiler.lap("rendering", start)
+        if self.unthrottled:
+            self.clock.tick() # only measures frame time
+        else:
+            self.clock.tick(FPS) # keeps loop at FPS
+
+
+    def handle_key(self, key):
+        if key == pygame.K_p: # toggle profiler
+            profiler.set_enabled(not profiler.enabled)
+        elif key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS): # more ticks per frame
+            self.ticks_per_frame = min(self.ticks_per_frame * 2, MAX_TICKS_PER_FRAME)
+        elif key in (pygame.K_MINUS, pygame.K_KP_MINUS): # fewer ticks per frame
+            self.ticks_per_frame = max(self.ticks_per_frame // 2, 1)
+        elif key == pygame.K_u: # toggle FPS cap
+            self.unthrottled = not self.unthrottled
+        elif pygame.K_0 <= key <= pygame.K_9: # draw only the k fittest agents (0 = all)
+            self.top_k = key - pygame.K_0
+        else:
+            return
+        self.status_surface = None
+
+
+    def visible_agents(self, pop):
+        if not self.top_k or self.top_k >= len(pop.agents):
+            return pop.agents
+        return [pop.agents[i] for i in top_indices(pop.state.fitnesses, self.top_k)]
+
+
+    def draw_status(self):
+        # controls text is only rendered again after a key changed it
+        if self.status_surface is None:
+            text = f"Ticks/frame: {self.ticks_per_frame}"
+            if self.unthrottled:
+                text += ", unthrottled"
+            if self.top_k:
+                text += f", top {self.top_k} agents"
+            self.status_surface = self.font.render(text, True, TEXT_COLOR)
+        self.screen.blit(self.status_surface, (10, 90))
+
+
+    def on_finish(self, trainer):
+        pygame.quit()
+
+
+    def update_camera(self, pop):
+        camera_center = (pop.furthest_agents[0].rect.center) # center camera on best agent
+
+        self.camera_offset.x = camera_center[0] - SCREEN_WIDTH // 2
+        self.camera_offset.y = camera_center[1] - SCREEN_HEIGHT // 2
+        self.camera_offset.x = max(0, min(self.camera_offset.x, WORLD_WIDTH - SCREEN_WIDTH))
+        self.camera_offset.y = max(0, min(self.camera_offset.y, WORLD_HEIGHT - SCREEN_HEIGHT))
@@ -0,0 +1,186 @@
+"""
+replay viewer for trajectories recorded with trainer.py --record
+tasks:
+1. drawing recorded cars of a generation on the track (nothing is simulated)
+2. scrubbing (arrow keys or timeline), pausing and fast-forwarding playback
+3. stepping between recorded generations
+4. comparing runs (one color per recorded file)
+controls: space pause, left/right step, +/- playback speed, up/down generation, page up/down 10 generations, home restart
+"""
+import argparse
+import os
+import numpy as np
+import pygame
+from settings import *
+from environment import Environment
+from trajectory import Run
+
+RUN_COLORS = ((0, 255, 0), (255, 170, 0), (0, 200, 255), (255, 80, 200), (255, 255, 80))
+TIMELINE = pygame.Rect(10, SCREEN_HEIGHT - 30, SCREEN_WIDTH - 20, 10)
+
+
+class ReplayViewer():
+    def __init__(self, runs, top_k=None):
+        self.runs = runs
+        self.top_k = top_k # recorded agents drawn per run and generation (None = all)
+        self.generations = np.unique(np.concatenate([run.generations for run in runs]))
+        if not len(self.generations):
+            raise ValueError("recording contains no generations")
+        if len({run.track for run in runs}) > 1:
+            print("Runs were recorded on different tracks, showing track of first run")
+
+        pygame.init()
+        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        pygame.display.set_caption("Replay")
+        self.clock = pygame.time.Clock()
+        self.font = pygame.font.SysFont(None, 25)
+        self.env = Environment(runs[0].track)
+        self.camera_offset = pygame.Vector2(0, 0)
+
+        # car surfaces of each run (rank 0 opaque, other ranks faded)
+        self.templates = []
+        for i in range(len(runs)):
+            template = pygame.Surface((AGENT_WIDTH, AGENT_HEIGHT), pygame.SRCALPHA)
+            template.fill(RUN_COLORS[i % len(RUN_COLORS)])
+            faded = template.copy()
+            faded.set_alpha(110)
+            self.templates.append((template, faded))
+
+        self.generation_i = 0
+        self.speed = 1 # ticks advanced per frame
+        self.playing = True
+        self.load_generation(0)
+
+
+    def load_generation(self, generation_i):
+        self.generation_i = int(np.clip(generation_i, 0, len(self.generations) - 1))
+        generation = self.generations[self.generation_i]
+        self.trajectories = [run.trajectories(generation)[:self.top_k] for run in self.runs]
+        self.length = max([len(trajectory[2]) for trajectories in self.trajectories for trajectory in trajectories] + [1])
+        self.tick = 0
+
+
+    def run(self):
+        running = True
+        while running:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type == pygame.KEYDOWN:
+                    self.handle_key(event.key)
+                elif (event.type == pygame.MOUSEBUTTONDOWN and event.button == 1) or (event.type == pygame.MOUSEMOTION and event.buttons[0]):
+                    if TIMELINE.inflate(0, 20).collidepoint(event.pos): # scrub along timeline
+                        self.tick = round((event.pos[0] - TIMELINE.left) / TIMELINE.width * (self.length - 1))
+                        self.tick = min(max(self.tick, 0), self.length - 1)
+
+            if self.playing:
+                self.tick = min(self.tick + self.speed, self.length - 1)
+
+            self.draw()
+            self.clock.tick(FPS)
+        pygame.quit()
+
+
+    def handle_key(self, key):
+        if key == pygame.K_SPACE:
+            self.playing = not self.playing
+        elif key == pygame.K_RIGHT:
+            self.playing = False
+            self.tick = min(self.tick + 1, self.length - 1)
+        elif key == pygame.K_LEFT:
+            self.playing = False
+            self.tick = max(self.tick - 1, 0)
+        elif key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):
+            self.speed = min(self.speed * 2, MAX_TICKS_PER_FRAME)
+        elif key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+            self.speed = max(self.speed // 2, 1)
+        elif key == pygame.K_UP:
+            self.load_generation(self.generation_i + 1)
+        elif key == pygame.K_DOWN:
+            self.load_generation(self.generation_i - 1)
+        elif key == pygame.K_PAGEUP:
+            self.load_generation(self.generation_i + 10)
+        elif key == pygame.K_PAGEDOWN:
+            self.load_generation(self.generation_i - 10)
+        elif key == pygame.K_HOME:
+            self.tick = 0
+
+
+    def update_camera(self):
+        # follow the champion (rank 0 of every run) that drove furthest until current tick
+        best = None
+        best_distance = -1
+        for trajectories in self.trajectories:
+            if trajectories:
+                positions, speeds = trajectories[0][2], trajectories[0][4]
+                sample = min(self.tick, len(positions) - 1)
+                distance = speeds[:sample + 1].sum()
+                if distance > best_distance:
+                    best, best_distance = positions[sample], distance
+        if best is None:
+            return
+
+        self.camera_offset.x = max(0, min(best[0] - SCREEN_WIDTH // 2, WORLD_WIDTH - SCREEN_WIDTH))
+        self.camera_offset.y = max(0, min(best[1] - SCREEN_HEIGHT // 2, WORLD_HEIGHT - SCREEN_HEIGHT))
+
+
+    def draw(self):
+        self.update_camera()
+        self.screen.fill(BG_COLOR)
+        self.env.draw_track(self.screen, self.camera_offset)
+
+        for run_i, (run, trajectories) in enumerate(zip(self.runs, self.trajectories)):
+            for rank, fitness, positions, angles, speeds, sensors in reversed(trajectories): # champion drawn last (on top)
+                sample = min(self.tick, len(positions) - 1)
+                ended = self.tick >= len(positions) - 1
+                template = self.templates[run_i][1 if rank or ended else 0]
+                surface = pygame.transform.rotate(template, -float(angles[sample]))
+                center = (positions[sample][0] - self.camera_offset.x, positions[sample][1] - self.camera_offset.y)
+                self.screen.blit(surface, surface.get_rect(center=center))
+
+                if rank == 0 and not ended: # sensor dots, measured from pose before this tick
+                    origin = positions[sample - 1] if sample else run.agent_start
+                    origin_angle = np.radians(angles[sample - 1] if sample else 90.0)
+                    for sensor_angle, distance in zip(run.sensor_angles, sensors[sample]):
+                        point = (origin[0] + np.cos(origin_angle + sensor_angle) * distance * run.max_sensor_dist - self.camera_offset.x,
+                                 origin[1] + np.sin(origin_angle + sensor_angle) * distance * run.max_sensor_dist - self.camera_offset.y)
+                        pygame.draw.circle(self.screen, SENSOR_COLOR, point, 5)
+
+        self.draw_hud()
+        pygame.display.flip()
+
+
+    def draw_hud(self):
+        generation = self.generations[self.generation_i]
+        state = "playing" if self.playing else "paused"
+        self.env.draw_text(self.screen, self.font, f"Generation: {generation} ({self.generation_i + 1}/{len(self.generations)})", (10, 10))
+        self.env.draw_text(self.screen, self.font, f"Tick: {self.tick + 1}/{self.length}, x{self.speed} {state}", (10, 30))
+        for run_i, (run, trajectories) in enumerate(zip(self.runs, self.trajectories)):
+            if trajectories:
+                speeds = trajectories[0][4]
+                text = f"{os.path.basename(run.path)}: fitness {trajectories[0][1]:.3f}, speed {speeds[min(self.tick, len(speeds) - 1)]:.2f}"
+            else:
+                text = f"{os.path.basename(run.path)}: not recorded"
+            self.env.draw_text(self.screen, self.font, text, (10, 50 + run_i * 20), RUN_COLORS[run_i % len(RUN_COLORS)])
+
+        pygame.draw.rect(self.screen, TRACK_COLOR, TIMELINE, 1)
+        progress = TIMELINE.copy()
+        progress.width = round(TIMELINE.width * self.tick / max(self.length - 1, 1))
+        pygame.draw.rect(self.screen, TEXT_COLOR, progress)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="replay trajectories recorded with trainer.py --record (compare runs by passing several files)")
+    parser.add_argument("paths", nargs="+", help="recorded .npz files")
+    parser.add_argument("--generation", type=int, default=None, help="generation shown first (default: first recorded)")
+    parser.add_argument("--top", type=int, default=None, help="recorded agents drawn per run (default: all)")
+    args = parser.parse_args()
+
+    viewer = ReplayViewer([Run(path) for path in args.paths], args.top)
+    if args.generation is not None:
+        viewer.load_generation(int(np.searchsorted(viewer.generations, args.generation)))
+    viewer.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,12 @@ WORLD_WIDTH, WORLD_HEIGHT = 3200, 1800 # dimensions of window
 SCREEN_WIDTH, SCREEN_HEIGHT = 1600, 900 # dimensions of entire world/course
 FPS = 70
 BG_COLOR = (30, 30, 30)
+PROFILE = False # time each phase of a tick (toggle with P)
+PROFILE_SMOOTHING = 0.05 # weight of newest tick in profiler overlay averages
+TICKS_PER_FRAME = 1 # simulation ticks per rendered frame (change with +/-)
+MAX_TICKS_PER_FRAME = 512
+UNTHROTTLED = False # ignore FPS cap (toggle with U)
+RENDER_TOP_K = 0 # only draw the k fittest agents, 0 = all (set with 0-9)
 
 # environment
 TRACK_COLOR = (150, 150, 150)
@@ -14,12 +20,30 @@ TRACK_LENGTH = 7000 # distance from start to finish (approximate)
 FILE_NAME = "tracks/track3.json"
 SENSOR_COLOR = (150, 150, 255)
 TEXT_COLOR = (255, 255, 255)
+TRACK_LAYER_KEY = (255, 0, 255) # transparent color of pre-rendered track (must differ from TRACK_COLOR)
 GRID_SIZE = 150
+USE_DISTANCE_FIELD = False # car collision using distance field lookups instead of masks
+DIST_FIELD_MAX = 32 # distances stored up to this many pixels
+TRACK_CACHE_DIR = ".track_cache"
 
 # population
 POP_SIZE = 10
 NUM_GEN = 100
 NUM_PARENTS = 2
+NUM_WORKERS = None # processes for parallel evaluation (None = all cores)
+NUM_ISLANDS = 4 # populations of island model
+MIGRATION_TOPOLOGY = "ring" # "ring" (send to next island) or "full" (send to all islands)
+MIGRATION_INTERVAL = 5 # generations between migrations
+NUM_MIGRANTS = 1 # genomes sent by each island per migration
+METRICS_PERCENTILES = (10, 50, 90) # fitness and distance percentiles in per-generation metrics
+METRICS_MAX_BYTES = 64 * 1024 * 1024 # size of metrics log part before writing to the next one (0 = single file)
+METRICS_FLUSH_INTERVAL = 1.0 # seconds without new records before buffered metrics are flushed
+RECORD_TOP_K = 3 # fittest agents of every generation whose trajectories are recorded
+ARCHIVE_FILE = "hall_of_fame.sqlite" # archive of champion genomes
+ARCHIVE_TOP_K = 3 # fittest genomes of every generation added to the archive
+WARM_START_MUTATION = 0.3 # mutation magnitude of copies of archived genomes filling the rest of a warm started population (0 = random genomes)
+CHECKPOINT_INTERVAL = 10 # generations between checkpoints (the latest generation is also saved when training ends)
+RECORD_SAVE_INTERVAL = 10 # generations between writes of a new trajectory part file (0 = only when training ends)
 
 # agent
 AGENT_WIDTH = 35
@@ -32,9 +56,20 @@ MAX_SENSOR_DIST = 250
 MAX_ANG_VEL = 2
 MAX_SPEED = 7
 MIN_SPEED = 3
+TIMESTEP = 1.0 # frames simulated per tick (speeds are per frame)
+SWEEP_SPACING = 8 # max distance (pixels) any car point moves between collision checks (below segment width to avoid tunneling)
+MAX_EPISODE_TICKS = None # hard budget per generation in frames, i.e. ticks at TIMESTEP 1 (None = until all agents crash)
+STALL_WINDOW = 0 # frames of sliding window for no progress check (0 = off)
+STALL_MIN_PROGRESS = 60 # min straight-line distance moved during STALL_WINDOW frames
+BEST_CUTOFF = False # end agents that can't reach the top NUM_PARENTS anymore (needs MAX_EPISODE_TICKS)
 DIST_WEIGHT = 1
 AVG_SPEED_WEIGHT = 0.3
 RAY_STEP = 5
+SPRITE_ANGLE_STEP = 1 # degrees between cached car rotations
+SPRITE_CACHE_SIZE = 720 # max cached rotated surfaces/masks (alive and dead)
+RAY_CASTER = "march" # "march" (fixed RAY_STEP samples of occupancy array), "analytic" (exact segment intersection) or "sphere" (distance field)
+SPHERE_TRACE_STEPS = 24 # max steps per sphere traced ray
+CAR_SAMPLE_SPACING = 8 # max gap between car outline points for distance field collision
 
 # genome
 MUT_RATE = 0.4
@@ -42,7 +77,19 @@ MAX_WEIGHT = 1.0
 INITIAL_MUT_MAG = 2
 DECAY_RATE = 0.03
 FITNESS_SCALE = 1.7
+CROSSOVER = "average" # "average" (mean of parents), "uniform" (each weight from either parent) or "blend" (BLX-alpha)
+BLEND_ALPHA = 0.5 # how far blend crossover may sample outside the parents' range
+SEED = None # seed of genome random number generator (None = unpredictable)
+ELITISM = 0 # fittest genomes copied unchanged into the next generation
+FITNESS_CACHE_SIZE = 10000 # max remembered episode results of genomes, reused instead of simulating again (0 = off)
+HALVING_ROUNDS = 0 # successive halving rounds screening HALVING_ETA ** HALVING_ROUNDS times the offspring with short episodes (0 = off)
+HALVING_ETA = 2 # each round keeps 1 / HALVING_ETA of the candidates and multiplies the tick budget by HALVING_ETA
+HALVING_MIN_TICKS = 100 # frames of the first screening round (at TIMESTEP 1 = ticks)
 
 
 # NeuralNetwork
-NUM_HIDDEN_NEURONS = 6
\ No newline at end of file
+NUM_HIDDEN_NEURONS = 6
+HIDDEN_LAYERS = (NUM_HIDDEN_NEURONS,) # neurons of each hidden layer (input and output sizes follow from sensors and controls)
+USE_BIASES = False # bias per neuron (stored after the weights of each layer)
+HIDDEN_ACTIVATION = "tanh" # "tanh", "relu", "sigmoid" or "linear"
+OUTPUT_ACTIVATION = "tanh" # outputs are mapped from [-1, 1] to car controls
\ No newline at end of file
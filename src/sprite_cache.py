@@ -0,0 +1,80 @@
+"""
+file for sprite cache class
+tasks:
+1. storing rotated car surfaces and masks keyed by quantized angle and color
+2. creating missing entries lazily and evicting least recently used ones
+3. counting cache hits and misses
+4. listing the outline pixels of every rotated car mask for vectorized collision tests
+"""
+import pygame
+import numpy as np
+from collections import OrderedDict
+from settings import *
+from cache_stats import CacheStats
+
+
+class SpriteCache(CacheStats):
+    def __init__(self, max_size=SPRITE_CACHE_SIZE):
+        self.max_size = max_size
+        self.sprites = OrderedDict() # (angle step, alive): (surface, mask)
+        self.hits = 0
+        self.misses = 0
+        self._mask_offsets = None # pixel offsets of car masks, created when first needed
+
+        # template surfaces to rotate
+        self.templates = {}
+        for alive, color in ((True, AGENT_ALIVE_COLOR), (False, AGENT_DEAD_COLOR)):
+            self.templates[alive] = pygame.Surface((AGENT_WIDTH, AGENT_HEIGHT), pygame.SRCALPHA)
+            self.templates[alive].fill(color)
+
+
+    def get(self, angle, alive):
+        angle_step = round(angle / SPRITE_ANGLE_STEP) % round(360 / SPRITE_ANGLE_STEP) # quantize angle
+        key = (angle_step, alive)
+
+        if key in self.sprites:
+            self.hits += 1
+            self.sprites.move_to_end(key) # mark as recently used
+            return self.sprites[key]
+
+        self.misses += 1
+        surface = pygame.transform.rotate(self.templates[alive], -angle_step * SPRITE_ANGLE_STEP)
+        sprite = (surface, pygame.mask.from_surface(surface))
+
+        self.sprites[key] = sprite
+        if len(self.sprites) > self.max_size:
+            self.sprites.popitem(last=False) # evict least recently used sprite
+
+        return sprite
+
+
+    def mask_offsets(self):
+        # (num angle steps, max pixels, 2) offsets of outline pixels from the rect center of each rotated car (padded with the first pixel)
+        # outline is enough for collisions with shapes that are too large to fit inside the car (track segments)
+        if self._mask_offsets is None:
+            num_steps = round(360 / SPRITE_ANGLE_STEP)
+            pixels = []
+            for angle_step in range(num_steps):
+                surface = pygame.transform.rotate(self.templates[True], -angle_step * SPRITE_ANGLE_STEP)
+                solid = np.pad(pygame.surfarray.array_alpha(surface) > 127, 1) # same threshold as mask.from_surface
+                inner = solid[1:-1, 1:-1] & solid[:-2, 1:-1] & solid[2:, 1:-1] & solid[1:-1, :-2] & solid[1:-1, 2:] # all 4 neighbors solid
+                xs, ys = np.nonzero(solid[1:-1, 1:-1] & ~inner)
+                pixels.append(np.stack((xs - surface.get_width() // 2, ys - surface.get_height() // 2), axis=1))
+
+            self._mask_offsets = np.empty((num_steps, max(len(p) for p in pixels), 2), dtype=np.int64)
+            for angle_step, p in enumerate(pixels):
+                self._mask_offsets[angle_step] = p[0]
+                self._mask_offsets[angle_step, :len(p)] = p
+        return self._mask_offsets
+
+
+    def angle_steps(self, angles):
+        # quantize an array of angles like get
+        return np.round(np.asarray(angles) / SPRITE_ANGLE_STEP).astype(np.int64) % round(360 / SPRITE_ANGLE_STEP)
+
+
+    def __len__(self):
+        return len(self.sprites)
+
+
+sprite_cache = SpriteCache() # shared by all agents
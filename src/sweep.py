@@ -0,0 +1,215 @@
+"""
+file for parameter sweeps
+tasks:
+1. building trials from a grid (every combination of values) or a random search (values sampled from lists or ranges)
+2. running trials on a process pool, each with its own config, seed and generation budget
+3. measuring time to completion (generations, ticks and seconds until an agent drove TRACK_LENGTH)
+4. printing a summary table of all trials (fastest completions first) and optionally writing it to a csv file
+"""
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import random
+import time
+from settings import *
+from config import Config, parse_value
+from trainer import Trainer, Observer
+from environment import Environment
+from evaluation import SerialEvaluator
+from genome import seed as seed_genomes
+
+COLUMNS = ["completed_generation", "completed_ticks", "completed_seconds", "best_fitness", "best_distance", "generations", "seconds"]
+
+
+######################################################################################
+# Search space
+######################################################################################
+
+def parse_values(values):
+    # list of values, or a (low, high) range given as "low:high" (random search only)
+    if len(values) == 1 and values[0].count(":") == 1:
+        low, high = (parse_value(bound) for bound in values[0].split(":"))
+        if isinstance(low, (int, float)) and isinstance(high, (int, float)):
+            return (low, high)
+    return [parse_value(value) for value in values]
+
+
+def grid_trials(space):
+    # every combination of values
+    for name, values in space.items():
+        if isinstance(values, tuple):
+            raise ValueError(f"grid search needs a list of values for {name}, not a range")
+    names = list(space)
+    return [dict(zip(names, combination)) for combination in itertools.product(*space.values())]
+
+
+def random_trials(space, num_trials, seed=None):
+    # values drawn uniformly from lists (choice) or ranges (integers if both bounds are integers)
+    rng = random.Random(seed)
+    trials = []
+    for _ in range(num_trials):
+        overrides = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                overrides[name] = rng.randint(low, high) if isinstance(low, int) and isinstance(high, int) else rng.uniform(low, high)
+            else:
+                overrides[name] = rng.choice(values)
+        trials.append(overrides)
+    return trials
+
+
+######################################################################################
+# Trials
+######################################################################################
+
+class CompletionWatcher(Observer):
+    # records when an agent first drives the target distance, optionally stopping the trainer
+    def __init__(self, target_distance, stop=True):
+        self.target_distance = target_distance
+        self.stop = stop
+        self.start = time.perf_counter()
+        self.generation = None # generations trained until completion (None = not completed)
+        self.ticks = None
+        self.seconds = None
+
+
+    def on_generation(self, trainer):
+        if self.generation is None and trainer.pop.state.distances.max() >= self.target_distance:
+            self.generation = trainer.generations + 1 # generation isn't counted by the trainer until it evolved
+            self.ticks = trainer.total_ticks
+            self.seconds = time.perf_counter() - self.start
+            if self.stop:
+                trainer.stop()
+
+
+def run_trial(trial):
+    # train a population from scratch with the trial's settings, returns a row of the summary table
+    config = Config(**trial["overrides"])
+    seed_genomes(trial["seed"])
+    env = Environment(config=config)
+    trainer = Trainer(env, None, SerialEvaluator(env), config)
+    watcher = CompletionWatcher(trial["target_distance"] or config.TRACK_LENGTH, trial["stop_on_completion"])
+    trainer.attach(watcher)
+    stats = trainer.run(max_generations=trial["generations"], max_seconds=trial["seconds"])
+
+    return {
+        "trial": trial["trial"],
+        "seed": trial["seed"],
+        **trial["overrides"],
+        "completed_generation": watcher.generation,
+        "completed_ticks": watcher.ticks,
+        "completed_seconds": watcher.seconds,
+        "best_fitness": trainer.pop.best_fitness,
+        "best_distance": trainer.pop.best_distance,
+        "generations": stats["generations"],
+        "seconds": stats["seconds"]
+    }
+
+
+def run_sweep(trials, num_workers=NUM_WORKERS, verbose=True):
+    # num_workers 0 = run trials one after another in this process
+    results = []
+    if num_workers == 0:
+        outputs = map(run_trial, trials)
+    else:
+        pool = multiprocessing.Pool(num_workers or os.cpu_count(), maxtasksperchild=1) # fresh process (caches, random state) per trial
+        outputs = pool.imap_unordered(run_trial, trials)
+
+    for result in outputs:
+        results.append(result)
+        if verbose:
+            completed = f"completed in generation {result['completed_generation']}" if result["completed_generation"] else "not completed"
+            print(f"Trial {result['trial']} ({len(results)}/{len(trials)}): {completed}, best distance {result['best_distance']:.0f}")
+
+    if num_workers != 0:
+        pool.close()
+        pool.join()
+    return sorted(results, key=sort_key)
+
+
+def sort_key(result):
+    # completed trials first (fewest simulated ticks, seconds depend on other trials sharing the cores), then furthest best distance
+    if result["completed_generation"] is not None:
+        return (0, result["completed_ticks"], result["completed_seconds"])
+    return (1, 0, -result["best_distance"])
+
+
+######################################################################################
+# Summary
+######################################################################################
+
+def format_cell(value):
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.3f}" if abs(value) < 10 else f"{value:.0f}"
+    return str(value)
+
+
+def print_summary(results, names):
+    columns = ["trial", "seed", *names, *COLUMNS]
+    rows = [[format_cell(result.get(column)) for column in columns] for result in results]
+    widths = [max(len(column), *(len(row[i]) for row in rows)) for i, column in enumerate(columns)]
+
+    print("  ".join(column.rjust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(cell.rjust(width) for cell, width in zip(row, widths)))
+    completed = sum(result["completed_generation"] is not None for result in results)
+    print(f"{completed}/{len(results)} trials completed the track")
+
+
+def write_summary(path, results, names):
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=["trial", "seed", *names, *COLUMNS], extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="train with different runtime settings (grid or random search) and compare time to completion")
+    parser.add_argument("--param", nargs="+", action="append", default=[], metavar=("NAME", "VALUE"),
+                        help="setting and its values (e.g. --param MUT_RATE 0.2 0.4), random search also takes a range (--param MUT_RATE 0.1:0.6)")
+    parser.add_argument("--search", choices=("grid", "random"), default="grid")
+    parser.add_argument("--trials", type=int, default=10, help="number of random search trials")
+    parser.add_argument("--repeats", type=int, default=1, help="trials per setting combination (different seeds)")
+    parser.add_argument("--generations", type=int, default=NUM_GEN, help="generation budget per trial")
+    parser.add_argument("--seconds", type=float, default=None, help="wall-clock budget per trial in seconds")
+    parser.add_argument("--target", type=float, default=None, help="distance that counts as completing the track (default: TRACK_LENGTH of the trial)")
+    parser.add_argument("--keep-going", action="store_true", help="train for the whole budget after completing the track")
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS, help="trials run at once (0 = one after another in this process, default: all cores)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first trial (and of random search sampling)")
+    parser.add_argument("--output", metavar="PATH", help="write the summary table to PATH (.csv)")
+    args = parser.parse_args()
+
+    space = {}
+    for param in args.param:
+        if len(param) < 2:
+            parser.error(f"--param {param[0]} needs at least one value")
+        space[param[0]] = parse_values(param[1:])
+
+    try:
+        overrides = grid_trials(space) if args.search == "grid" else random_trials(space, args.trials, args.seed)
+        for trial_overrides in overrides:
+            Config(**trial_overrides) # fail before starting any trial
+    except ValueError as e:
+        parser.error(str(e))
+
+    trials = []
+    for trial_overrides in overrides:
+        for _ in range(args.repeats):
+            trials.append({"trial": len(trials), "seed": args.seed + len(trials), "overrides": trial_overrides,
+                           "generations": args.generations or None, "seconds": args.seconds,
+                           "target_distance": args.target, "stop_on_completion": not args.keep_going})
+    print(f"{len(trials)} trials ({args.search} search over {', '.join(space) or 'no settings'})")
+
+    results = run_sweep(trials, args.workers)
+    print_summary(results, list(space))
+    if args.output:
+        write_summary(args.output, results, list(space))
+
+
+if __name__ == "__main__":
+    main()
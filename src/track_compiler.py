@@ -0,0 +1,189 @@
+"""
+file for track compiler
+tasks:
+1. converting json track data to collision arrays (segment geometry, spatial grid, edges, occupancy)
+2. computing distance field of the track
+3. caching compiled arrays on disk, keyed by a hash of the json file and relevant settings
+4. loading cached arrays with memory mapping
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import shutil
+import tempfile
+import pygame
+import numpy as np
+from settings import *
+from atomic_file import atomic_write
+
+COMPILER_VERSION = 1 # increase when compiled arrays change
+
+
+def track_key(track_bytes):
+    # hash of track file and every setting the compiled arrays depend on
+    settings_key = repr((COMPILER_VERSION, WORLD_WIDTH, WORLD_HEIGHT, GRID_SIZE, DIST_FIELD_MAX))
+    return hashlib.sha1(track_bytes + settings_key.encode()).hexdigest()
+
+
+def compile_track(filename, distance_field=False):
+    # load compiled arrays of track file, compiling and caching them first if needed
+    with open(filename, "rb") as file:
+        track_bytes = file.read()
+    cache_dir = os.path.join(TRACK_CACHE_DIR, track_key(track_bytes))
+
+    if not os.path.isdir(cache_dir):
+        print(f"Compiling {filename}...")
+        _save_arrays(cache_dir, build_track(json.loads(track_bytes)))
+
+    if distance_field and not os.path.exists(os.path.join(cache_dir, "distance_field.npy")):
+        print("Building distance field...")
+        occupancy = np.load(os.path.join(cache_dir, "occupancy.npy"))
+        _save_arrays(cache_dir, {"distance_field": compute_distance_field(occupancy)})
+
+    # memory mapped, so repeated and parallel loads share the same pages
+    return {name[:-4]: np.load(os.path.join(cache_dir, name), mmap_mode="r") for name in os.listdir(cache_dir) if name.endswith(".npy")}
+
+
+def _save_arrays(cache_dir, arrays):
+    if os.path.isdir(cache_dir): # extra arrays for existing track
+        for name, array in arrays.items():
+            with atomic_write(os.path.join(cache_dir, f"{name}.npy")) as file:
+                np.save(file, array)
+        return
+
+    # new track: all arrays are written to a temporary directory that is renamed into place at once
+    os.makedirs(TRACK_CACHE_DIR, exist_ok=True)
+    temp_dir = tempfile.mkdtemp(dir=TRACK_CACHE_DIR)
+    for name, array in arrays.items():
+        np.save(os.path.join(temp_dir, f"{name}.npy"), array)
+    try:
+        os.rename(temp_dir, cache_dir)
+    except OSError: # compiled by another process in the meantime
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def build_track(data):
+    # data: list of segments from track_editor.py
+    segments = np.array([(seg["x"], seg["y"], seg["angle"], seg["height"], seg["width"]) for seg in data], dtype=np.float64).reshape(-1, 5)
+    rects = []
+    corners = []
+
+    # draw every segment once into a world-sized surface
+    world_surface = pygame.Surface((WORLD_WIDTH, WORLD_HEIGHT), pygame.SRCALPHA)
+    for x, y, angle, height, width in segments:
+        surf = pygame.Surface((int(width), int(height)), pygame.SRCALPHA)
+        surf.fill(TRACK_COLOR)
+        rotated_surf = pygame.transform.rotate(surf, -angle)
+        rect = rotated_surf.get_rect(center=(x, y))
+        world_surface.blit(rotated_surf, rect)
+        rects.append((rect.x, rect.y, rect.width, rect.height))
+
+        # corners of oriented rectangle (same rotation as the surface)
+        cos_a = math.cos(math.radians(angle))
+        sin_a = math.sin(math.radians(angle))
+        for local_x, local_y in ((-width / 2, -height / 2), (width / 2, -height / 2), (width / 2, height / 2), (-width / 2, height / 2)):
+            corners.append((x + local_x * cos_a - local_y * sin_a, y + local_x * sin_a + local_y * cos_a))
+
+    rects = np.array(rects, dtype=np.int64).reshape(-1, 4)
+    corners = np.array(corners, dtype=np.float64).reshape(-1, 4, 2)
+    grid_cells, grid_offsets, grid_segments = _create_grid(rects)
+
+    return {
+        "segments": segments,
+        "rects": rects,
+        "corners": corners,
+        "grid_cells": grid_cells,
+        "grid_offsets": grid_offsets,
+        "grid_segments": grid_segments,
+        "edges": _create_edges(corners),
+        "cell_edges": _create_cell_edges(grid_cells, grid_offsets, grid_segments),
+        "occupancy": pygame.surfarray.array_alpha(world_surface) > 127 # indexed [x, y], same threshold as mask.from_surface
+    }
+
+
+def _create_grid(rects):
+    # spatial grid: segment indices for every cell a segment's rect overlaps
+    print("Building spatial grid...")
+    grid = {}
+
+    for seg_idx, (x, y, width, height) in enumerate(rects.tolist()):
+        # find cell current segment overlaps
+        left_cell = x // GRID_SIZE
+        right_cell = (x + width) // GRID_SIZE
+        top_cell = y // GRID_SIZE
+        bottom_cell = (y + height) // GRID_SIZE
+
+        for grid_x in range(left_cell, right_cell + 1):
+            for grid_y in range(top_cell, bottom_cell + 1):
+                grid.setdefault((grid_x, grid_y), []).append(seg_idx) # add segment to cell of grid that it's in
+
+    print(f"Grid built with {len(grid)} cells")
+
+    # compressed rows: segments of cell i are grid_segments[grid_offsets[i]:grid_offsets[i + 1]]
+    grid_cells = np.array(list(grid.keys()), dtype=np.int64).reshape(-1, 2)
+    grid_offsets = np.cumsum([0] + [len(indices) for indices in grid.values()], dtype=np.int64)
+    grid_segments = np.array([i for indices in grid.values() for i in indices], dtype=np.int64)
+    return grid_cells, grid_offsets, grid_segments
+
+
+def _create_edges(corners):
+    # 4 edges per segment as start points and direction vectors
+    starts = corners
+    ends = np.roll(corners, -1, axis=1)
+    return np.concatenate((starts, ends - starts), axis=2).reshape(-1, 4)
+
+
+def _create_cell_edges(grid_cells, grid_offsets, grid_segments):
+    # dense table of edge indices for every grid cell in the world (-1 = padding)
+    grid_cols = math.ceil(WORLD_WIDTH / GRID_SIZE)
+    grid_rows = math.ceil(WORLD_HEIGHT / GRID_SIZE)
+    cell_edges = {}
+    for cell_i, (grid_x, grid_y) in enumerate(grid_cells.tolist()):
+        if 0 <= grid_x < grid_cols and 0 <= grid_y < grid_rows:
+            seg_indices = grid_segments[grid_offsets[cell_i]:grid_offsets[cell_i + 1]]
+            cell_edges[grid_x * grid_rows + grid_y] = [seg_idx * 4 + i for seg_idx in seg_indices for i in range(4)]
+
+    max_edges = max([len(indices) for indices in cell_edges.values()], default=0)
+    table = np.full((grid_cols * grid_rows, max(max_edges, 1)), -1, dtype=np.int64)
+    for cell, indices in cell_edges.items():
+        table[cell, :len(indices)] = indices
+    return table
+
+
+def compute_distance_field(occupancy):
+    # occupancy with a 1 pixel wall around the world (leaving the world counts as a hit)
+    walls = np.ones((WORLD_WIDTH + 2, WORLD_HEIGHT + 2), dtype=bool)
+    walls[1:-1, 1:-1] = occupancy
+
+    # pass 1: distance to nearest wall in same column
+    idx = np.arange(WORLD_HEIGHT + 2, dtype=np.int32)
+    above = np.maximum.accumulate(np.where(walls, idx, -1), axis=1)
+    below = np.minimum.accumulate(np.where(walls, idx, WORLD_HEIGHT + 2)[:, ::-1], axis=1)[:, ::-1]
+    column_dist = np.minimum(np.minimum(idx - above, below - idx), DIST_FIELD_MAX + 1)
+    column_sq = column_dist.astype(np.int32) ** 2
+
+    # pass 2: combine columns within DIST_FIELD_MAX (exact euclidean distance up to the cap)
+    dist_sq = column_sq.copy()
+    for offset in range(1, DIST_FIELD_MAX + 1):
+        np.minimum(dist_sq[offset:], column_sq[:-offset] + offset * offset, out=dist_sq[offset:])
+        np.minimum(dist_sq[:-offset], column_sq[offset:] + offset * offset, out=dist_sq[:-offset])
+
+    distances = np.minimum(np.floor(np.sqrt(dist_sq[1:-1, 1:-1])), DIST_FIELD_MAX)
+    return distances.astype(np.uint16) # indexed [x, y], 0 = inside a segment
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compile track files into cached collision arrays")
+    parser.add_argument("files", nargs="+", help="track json files")
+    parser.add_argument("--distance-field", action="store_true", help="also compile the distance field")
+    args = parser.parse_args()
+
+    for filename in args.files:
+        track = compile_track(filename, args.distance_field)
+        print(f"{filename}: {len(track['segments'])} segments, {', '.join(sorted(track))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+file for trainer class
+tasks:
+1. running the simulation loop without a window or frame cap (headless)
+2. stopping after a generation count or wall-clock budget
+3. notifying attached observers (e.g. renderer) every tick and generation
+4. reporting training throughput (generations/s and ticks/s)
+5. optionally evaluating whole generations with a process pool
+6. overriding runtime settings from the command line (--set NAME=VALUE)
+7. attaching successive halving to the population when HALVING_ROUNDS is set
+8. stopping cleanly on Ctrl+C and SIGTERM (observers save, logs are flushed and the run is reported)
+"""
+import argparse
+import os
+import signal
+import time
+import numpy as np
+from settings import *
+from config import Config, parse_overrides
+from environment import Environment
+from population import Population
+from evaluation import SuccessiveHalving
+from sprite_cache import sprite_cache
+from agent_state import END_REASONS
+from profiler import profiler
+from genome import seed as seed_genomes
+
+
+class Observer():
+    # base class for objects attached to a trainer, override the hooks that are needed
+    def on_tick(self, trainer):
+        pass
+
+
+    def on_generation(self, trainer):
+        pass
+
+
+    def on_evolve(self, trainer):
+        # next generation was spawned and nothing of it is simulated yet
+        pass
+
+
+    def on_finish(self, trainer):
+        pass
+
+
+class Trainer():
+    def __init__(self, env:Environment=None, pop:Population=None, evaluator=None, config:Config=None):
+        self.config = config if config is not None else Config() # used by environment and population created here
+        self.env = env if env is not None else Environment(config=self.config)
+        self.pop = pop if pop is not None else Population(config=self.config)
+        if self.pop.config.HALVING_ROUNDS and self.pop.screening is None: # offspring are screened on this environment
+            self.pop.screening = SuccessiveHalving(self.env, self.pop.config)
+        self.evaluator = evaluator # evaluates a whole generation per step (None = tick by tick)
+        self.observers = []
+
+        self.iterations = 1 # number of iterations (ticks) for the current generation
+        self.total_ticks = 0 # ticks simulated during run
+        self.generations = 0 # generations completed during run
+        self.running = False
+
+
+    def attach(self, observer:Observer):
+        self.observers.append(observer)
+
+
+    def stop(self):
+        self.running = False
+
+
+    def step(self):
+        if self.evaluator is not None:
+            self.step_generation()
+            return
+
+        # advance simulation by a single tick
+        self.pop.update_agents(self.env, None, self.iterations)
+        self.total_ticks += 1
+
+        for observer in self.observers:
+            observer.on_tick(self)
+
+        # check for evolution
+        if self.pop.all_dead():
+            for observer in self.observers:
+                observer.on_generation(self) # observers see the finished generation before it is replaced
+            self.pop.evolve()
+            self.generations += 1
+            self.iterations = 0 # reset iteration count
+            for observer in self.observers:
+                observer.on_evolve(self)
+
+        if profiler.enabled:
+            profiler.end_tick(self.pop.generation, self.total_ticks)
+        self.iterations += 1
+
+
+    def step_generation(self):
+        # evaluate the whole generation at once (no per tick observers)
+        self.iterations = self.pop.evaluate(self.evaluator)
+        self.total_ticks += self.iterations
+
+        for observer in self.observers:
+            observer.on_generation(self)
+        self.pop.evolve()
+        self.generations += 1
+        self.iterations = 1
+        for observer in self.observers:
+            observer.on_evolve(self)
+
+
+    def run(self, max_generations=None, max_seconds=None):
+        # run until stopped, generation count reached or time budget spent (None = no limit)
+        self.running = True
+        start_time = time.perf_counter()
+
+        try:
+            while self.running:
+                self.step()
+
+                if max_generations is not None and self.generations >= max_generations:
+                    self.running = False
+                elif max_seconds is not None and time.perf_counter() - start_time >= max_seconds:
+                    self.running = False
+        finally: # observers finish (save checkpoints, recordings) even if training is interrupted
+            self.running = False
+            for observer in self.observers:
+                observer.on_finish(self)
+
+        elapsed = time.perf_counter() - start_time
+
+        return self.stats(elapsed)
+
+
+    def stats(self, elapsed):
+        elapsed = max(elapsed, 1e-9) # avoid division by zero for empty runs
+        return {
+            "generations": self.generations,
+            "ticks": self.total_ticks,
+            "seconds": elapsed,
+            "generations_per_sec": self.generations / elapsed,
+            "ticks_per_sec": self.total_ticks / elapsed,
+            "generation": self.pop.generation,
+            "sprite_cache": sprite_cache.stats(),
+            "fitness_cache": self.pop.fitness_cache.stats() if self.pop.fitness_cache is not None else None,
+            "screening": self.pop.screening.stats() if self.pop.screening is not None else None
+        }
+
+
+class ProgressPrinter(Observer):
+    # prints a line per finished generation
+    def on_generation(self, trainer):
+        pop = trainer.pop
+        pop.select()
+        counts = np.bincount(pop.state.end_reasons, minlength=len(END_REASONS))
+        ended = ", ".join(f"{reason} {count}" for reason, count in zip(END_REASONS, counts) if count)
+        print(f"Generation {pop.generation}: best fitness {pop.best_agents[0].fitness:.3f}, "
+              f"best distance {pop.furthest_agents[0].distance:.0f}, ticks {trainer.iterations} ({ended})")
+
+
+def stop_on_signals(trainer):
+    # Ctrl+C and pre-emption (SIGTERM) finish the current step, then observers save and the run is reported as usual
+    def stop(signum, frame):
+        if not trainer.running: # second signal (or not training yet): interrupt at once, observers still finish
+            raise KeyboardInterrupt
+        print(f"{signal.Signals(signum).name} received, stopping after this step")
+        trainer.stop()
+
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, stop)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="train the population without a window or frame cap")
+    parser.add_argument("--generations", type=int, default=NUM_GEN, help="number of generations to train (0 = no limit)")
+    parser.add_argument("--seconds", type=float, default=None, help="wall-clock budget in seconds")
+    parser.add_argument("--render", action="store_true", help="attach the renderer (opens a window)")
+    parser.add_argument("--workers", type=int, default=None, help="evaluate generations with a pool of worker processes (0 = all cores)")
+    parser.add_argument("--quiet", action="store_true", help="don't print per-generation progress")
+    parser.add_argument("--seed", type=int, default=SEED, help="seed of the genome random number generator")
+    parser.add_argument("--metrics", metavar="PATH", help="append a record per generation to PATH (.jsonl or .csv, read with metrics.py)")
+    parser.add_argument("--record", metavar="PATH", help="record trajectories of the fittest agents of every generation to PATH (.npz, watch with replay.py)")
+    parser.add_argument("--checkpoint", metavar="PATH", help=f"save training state to PATH (.npz) every {CHECKPOINT_INTERVAL} generations and when training ends")
+    parser.add_argument("--resume", action="store_true", help="continue from --checkpoint PATH if it exists (--generations counts the generations before it)")
+    parser.add_argument("--archive", metavar="PATH", help=f"add the {ARCHIVE_TOP_K} fittest genomes of every generation to a hall of fame archive (sqlite)")
+    parser.add_argument("--warm-start", type=int, default=0, metavar="K", help=f"start from the K fittest archived genomes of the network topology (this track first, archive: --archive or {ARCHIVE_FILE})")
+    parser.add_argument("--profile", metavar="PATH", help="time each phase of every tick and write records to PATH (.csv or .jsonl)")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE", help="override a runtime setting of settings.py (e.g. --set POP_SIZE=50)")
+    args = parser.parse_args()
+    try:
+        config = Config(**parse_overrides(args.set))
+    except ValueError as e:
+        parser.error(str(e))
+    if args.render and args.workers is not None:
+        parser.error("--render shows ticks of the main process and can't be combined with --workers")
+    if args.resume and not args.checkpoint:
+        parser.error("--resume needs --checkpoint PATH")
+
+    evaluator = None
+    if args.workers is not None:
+        from evaluation import ParallelEvaluator
+        evaluator = ParallelEvaluator(args.workers or None, config)
+
+    if args.seed is not None:
+        seed_genomes(args.seed)
+    if args.profile:
+        profiler.open(args.profile)
+        profiler.set_enabled(True)
+
+    env = Environment(config=config)
+    pop = None
+    if args.warm_start:
+        from archive import GenomeArchive, topology_name
+        archive = GenomeArchive(args.archive or ARCHIVE_FILE)
+        warm_start = archive.top(args.warm_start, env.filename, topology_name(config))
+        archive.close()
+        print(f"Warm start from {len(warm_start)} archived genomes")
+        pop = Population(warm_start=warm_start, config=config)
+
+    trainer = Trainer(env, pop, evaluator, config)
+    resume_from = None # first generation simulated again, logs and recordings continue from there
+    if args.checkpoint:
+        from checkpoint import Checkpointer, load_checkpoint
+        if args.resume and os.path.exists(args.checkpoint):
+            load_checkpoint(args.checkpoint, trainer)
+            resume_from = trainer.pop.generation
+            print(f"Resuming from generation {trainer.pop.generation} ({trainer.generations} generations trained)")
+        trainer.attach(Checkpointer(args.checkpoint))
+    if args.metrics:
+        from metrics import MetricsWriter
+        trainer.pop.metrics = MetricsWriter(args.metrics, resume_from=resume_from)
+    if not args.quiet:
+        trainer.attach(ProgressPrinter())
+    if args.archive:
+        from archive import GenomeArchive, ArchiveWriter
+        trainer.attach(ArchiveWriter(GenomeArchive(args.archive)))
+    if args.record:
+        from trajectory import TrajectoryRecorder
+        trainer.attach(TrajectoryRecorder(args.record, resume_from=resume_from))
+    if args.render:
+        from renderer import Renderer # only import display code when a window is requested
+        trainer.attach(Renderer())
+
+    stop_on_signals(trainer)
+    try:
+        stats = trainer.run(max_generations=args.generations or None, max_seconds=args.seconds)
+    finally: # remaining metrics records are written even if training is interrupted
+        if evaluator is not None:
+            evaluator.close()
+        profiler.close()
+        if trainer.pop.metrics is not None:
+            trainer.pop.metrics.close()
+    print(f"{stats['generations']} generations, {stats['ticks']} ticks in {stats['seconds']:.2f}s "
+          f"({stats['generations_per_sec']:.2f} generations/s, {stats['ticks_per_sec']:.0f} ticks/s)")
+    cache = stats["sprite_cache"]
+    print(f"sprite cache: {cache['hits']} hits, {cache['misses']} misses ({cache['hit_rate']:.1%}), {cache['size']} entries")
+    cache = stats["fitness_cache"]
+    if cache is not None:
+        print(f"fitness cache: {cache['hits']} hits, {cache['misses']} misses ({cache['hit_rate']:.1%}), {cache['size']} entries")
+    screening = stats["screening"]
+    if screening is not None:
+        print(f"successive halving: {screening['screened']} candidates screened in {screening['ticks']} ticks (not counted above)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+file for trajectory recorder class
+tasks:
+1. re-simulating the RECORD_TOP_K fittest genomes of every generation after it finished (the simulation is deterministic)
+2. keeping their trajectories (position, angle, speed and sensor distances per tick), stored once per genome
+3. writing new trajectories to a new compressed part file every RECORD_SAVE_INTERVAL generations (atomically)
+4. continuing an existing recording when training is resumed
+5. loading all parts of a recorded run for replay.py
+note: sample t is the pose after tick t + 1, its sensor distances were measured from the pose before that tick
+"""
+import os
+import numpy as np
+from settings import *
+from config import Config
+from trainer import Observer
+from agent_state import AgentState
+from neural_network import BatchNeuralNetwork, network_layer_sizes
+from genome import genome_keys
+from metrics import part_path, remove_parts
+from atomic_file import atomic_write
+
+SAMPLE_ARRAYS = ("positions", "angles", "speeds", "sensors")
+RECORD_ARRAYS = ("generations", "ranks", "starts", "lengths", "fitnesses", "distances", "end_reasons")
+
+
+class TrajectoryRecorder(Observer):
+    def __init__(self, path, top_k=RECORD_TOP_K, save_interval=RECORD_SAVE_INTERVAL, resume_from=None):
+        # resume_from: first generation that is simulated again (None = start a new recording)
+        self.path = path
+        self.top_k = top_k
+        self.save_interval = save_interval
+        self.resume_from = resume_from # written to the next part, which replaces records of earlier parts from that generation on
+        self.part = 0 # next part file
+        self.generations = 0 # generations recorded since last save
+        self.num_samples = 0 # samples in all parts, including unsaved chunks
+        if resume_from is None:
+            remove_parts(path) # a new recording replaces an old one
+        else:
+            while os.path.exists(part_path(path, self.part)):
+                self.part += 1
+            if self.part:
+                with np.load(part_path(path, self.part - 1)) as data:
+                    self.num_samples = int(data["first_sample"]) + len(data["angles"])
+
+        # trajectories recorded since last save (data is stored once, records point into it by sample index over all parts)
+        self.chunks = {name: [] for name in SAMPLE_ARRAYS}
+        self.part_start = self.num_samples # first sample of unsaved chunks
+        self.records = {name: [] for name in RECORD_ARRAYS}
+        self.recorded = {} # genome key: (start, length) of kept trajectory, so genomes kept over generations are stored once
+        self.track = None
+        self.config = None # config of recorded population
+
+
+    def on_generation(self, trainer):
+        pop = trainer.pop
+        state = pop.state
+        self.track = trainer.env.filename
+        self.config = pop.config
+
+        order = np.argsort(-state.fitnesses, kind="stable")[:self.top_k]
+        keys = genome_keys(pop.weights[order])
+        new = [(i, key) for i, key in zip(order, keys) if key not in self.recorded and state.ticks[i]]
+        if new:
+            indices = [i for i, _ in new]
+            trajectories = self.simulate(trainer.env, pop.weights[indices], state.ticks[indices], pop.config)
+            for (i, key), trajectory in zip(new, trajectories):
+                self.recorded[key] = (self.num_samples, int(state.ticks[i]))
+                for name in SAMPLE_ARRAYS:
+                    self.chunks[name].append(trajectory[name])
+                self.num_samples += int(state.ticks[i])
+
+        for rank, (i, key) in enumerate(zip(order, keys)):
+            if key not in self.recorded: # crashed before its first tick
+                continue
+            start, length = self.recorded[key]
+            self.records["generations"].append(pop.generation)
+            self.records["ranks"].append(rank)
+            self.records["starts"].append(start)
+            self.records["lengths"].append(length)
+            self.records["fitnesses"].append(state.fitnesses[i])
+            self.records["distances"].append(state.distances[i])
+            self.records["end_reasons"].append(state.end_reasons[i])
+
+        self.generations += 1
+        if self.save_interval and self.generations >= self.save_interval:
+            self.save()
+
+
+    def on_finish(self, trainer):
+        self.save()
+
+
+    def simulate(self, env, weights, ticks, config):
+        # episodes of genomes again, each ending after its recorded number of ticks
+        # (cut off agents depended on the rest of their population, so they are ended by tick count instead)
+        state = AgentState(len(weights), config.replace(BEST_CUTOFF=False))
+        network = BatchNeuralNetwork(network_layer_sizes(config), weights, config)
+        buffers = {
+            "positions": np.zeros((ticks.max(), len(weights), 2), dtype=np.float32),
+            "angles": np.zeros((ticks.max(), len(weights)), dtype=np.float32),
+            "speeds": np.zeros((ticks.max(), len(weights)), dtype=np.float32),
+            "sensors": np.zeros((ticks.max(), len(weights), len(config.SENSOR_ANGLES)), dtype=np.float16) # normalized distances
+        }
+
+        for tick in range(ticks.max()):
+            state.step(env, network, tick + 1)
+            buffers["positions"][tick] = state.positions
+            buffers["angles"][tick] = state.angles
+            buffers["speeds"][tick] = state.speeds
+            buffers["sensors"][tick] = state.sensor_distances
+            state.alive[state.ticks >= ticks] = False
+
+        return [{name: buffer[:ticks[i], i].copy() for name, buffer in buffers.items()} for i in range(len(weights))]
+
+
+    def save(self):
+        # new trajectories and records go to the next part file (path, path.1, ...), earlier parts aren't rewritten
+        if not self.generations:
+            return
+        config = self.config if self.config is not None else Config()
+        arrays = {
+            "positions": np.zeros((0, 2), dtype=np.float32),
+            "angles": np.zeros(0, dtype=np.float32),
+            "speeds": np.zeros(0, dtype=np.float32),
+            "sensors": np.zeros((0, len(config.SENSOR_ANGLES)), dtype=np.float16)
+        }
+        arrays.update({name: np.concatenate(chunk) for name, chunk in self.chunks.items() if chunk})
+        arrays.update({name: np.array(values) for name, values in self.records.items()})
+        arrays["first_sample"] = np.array(self.part_start)
+        arrays["resumed_from"] = np.array(-1 if self.resume_from is None else self.resume_from)
+        arrays["track"] = np.array(self.track or config.FILE_NAME)
+        arrays["sensor_angles"] = np.array(config.SENSOR_ANGLES, dtype=np.float64)
+        arrays["max_sensor_dist"] = np.array(config.MAX_SENSOR_DIST)
+        arrays["agent_start"] = np.array(config.AGENT_START, dtype=np.float64)
+        arrays["timestep"] = np.array(config.TIMESTEP)
+
+        with atomic_write(part_path(self.path, self.part)) as file:
+            np.savez_compressed(file, **arrays)
+
+        self.part += 1
+        self.resume_from = None
+        self.generations = 0
+        self.part_start = self.num_samples
+        self.chunks = {name: [] for name in SAMPLE_ARRAYS}
+        self.records = {name: [] for name in RECORD_ARRAYS}
+
+
+class Run():
+    # recorded trajectories of all parts of a recording, loaded into memory
+    def __init__(self, path):
+        parts = []
+        while os.path.exists(part_path(path, len(parts))):
+            with np.load(part_path(path, len(parts))) as data:
+                parts.append({name: data[name] for name in data.files})
+        if not parts:
+            raise FileNotFoundError(f"no recording at {path}")
+
+        self.arrays = {name: np.concatenate([part[name] for part in parts]) for name in SAMPLE_ARRAYS + RECORD_ARRAYS}
+
+        # records of generations that were simulated again after resuming are replaced by the later part
+        keep = np.ones(len(self.arrays["generations"]), dtype=bool)
+        first_record = 0
+        for part in parts:
+            if int(part["resumed_from"]) >= 0:
+                keep[:first_record] &= self.arrays["generations"][:first_record] < int(part["resumed_from"])
+            first_record += len(part["generations"])
+        for name in RECORD_ARRAYS:
+            self.arrays[name] = self.arrays[name][keep]
+
+        self.path = path
+        self.track = str(parts[0]["track"])
+        self.sensor_angles = np.radians(parts[0]["sensor_angles"])
+        self.max_sensor_dist = float(parts[0]["max_sensor_dist"])
+        self.agent_start = parts[0]["agent_start"]
+        self.generations = np.unique(self.arrays["generations"])
+
+
+    def trajectories(self, generation):
+        # (rank, fitness, positions, angles, speeds, sensors) of kept agents of a generation, best first
+        found = []
+        for i in np.nonzero(self.arrays["generations"] == generation)[0]:
+            samples = slice(self.arrays["starts"][i], self.arrays["starts"][i] + self.arrays["lengths"][i])
+            found.append((int(self.arrays["ranks"][i]), float(self.arrays["fitnesses"][i]), self.arrays["positions"][samples],
+                          self.arrays["angles"][samples], self.arrays["speeds"][samples], self.arrays["sensors"][samples]))
+        return sorted(found, key=lambda trajectory: trajectory[0])
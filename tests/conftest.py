@@ -0,0 +1,8 @@
+"""
+pytest setup for the headless tests (the other files in this folder are interactive demos)
+"""
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") # no window needed
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
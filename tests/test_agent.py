@@ -0,0 +1,43 @@
+"""
+tests for agents (one agent on its own and the vectorized mask collision tests)
+"""
+import numpy as np
+from config import Config
+from environment import Environment
+from population import Population
+from agent import Agent
+from genome import Genome, seed
+from sprite_cache import sprite_cache
+from settings import WORLD_WIDTH, WORLD_HEIGHT
+
+TRACK = "tracks/track3.json"
+
+
+def test_masks_match_loop():
+    env = Environment(TRACK)
+    rng = np.random.default_rng(0)
+    positions = np.stack((rng.uniform(0, WORLD_WIDTH, 3000), rng.uniform(0, WORLD_HEIGHT, 3000)), axis=1)
+    positions[:1000] = np.round(positions[:1000]) + 0.5 # rect centers exactly between two pixels
+    angles = rng.uniform(-720, 720, 3000)
+
+    expected = []
+    for position, angle in zip(positions, angles):
+        surface, mask = sprite_cache.get(angle, True)
+        expected.append(env.is_on_track(mask, surface.get_rect(center=(position[0], position[1]))))
+    assert np.array_equal(env.is_on_track_masks(positions, angles), expected)
+
+
+def test_single_agent_matches_population():
+    # an agent with its own state drives like the same genome in a population
+    config = Config(POP_SIZE=4)
+    env = Environment(TRACK, config)
+    seed(0)
+    pop = Population(config=config)
+    agent = Agent(Genome(pop.weights[2].copy(), config), config=config)
+
+    for iterations in range(1, 200):
+        pop.update_agents(env, None, iterations)
+        agent.update(env, None, iterations)
+        assert agent.alive == pop.agents[2].alive
+        assert np.allclose(agent.position, pop.agents[2].position)
+    assert agent.distance > 0
@@ -0,0 +1,38 @@
+"""
+tests for the hall of fame archive and warm starts from it
+"""
+import numpy as np
+from config import Config
+from population import Population
+from archive import GenomeArchive, topology_name
+from genome import random_genomes, seed
+
+TRACK = "tracks/track3.json"
+
+
+def test_warm_start_from_empty_archive(tmp_path):
+    archive = GenomeArchive(str(tmp_path / "hof.sqlite"))
+    warm_start = archive.top(5, TRACK, topology_name())
+    assert len(warm_start) == 0
+
+    config = Config(POP_SIZE=6)
+    seed(0)
+    pop = Population(warm_start=warm_start, config=config)
+    seed(0)
+    assert np.array_equal(pop.weights, Population(config=config).weights) # same as a random start
+    assert Population(warm_start=np.zeros(0), config=config).weights.shape == (6, pop.num_weights) # empty of any shape
+
+
+def test_warm_start_from_archive(tmp_path):
+    config = Config(POP_SIZE=6)
+    archive = GenomeArchive(str(tmp_path / "hof.sqlite"))
+    weights = random_genomes(3, Population(config=config).num_weights)
+    archive.add(weights, np.array([0.5, 0.9, 0.7]), np.array([100.0, 300.0, 200.0]), 1, TRACK, topology_name(config))
+
+    warm_start = archive.top(2, TRACK, topology_name(config))
+    assert np.array_equal(warm_start, weights[[1, 2]]) # fittest first
+    assert len(archive.top(2, TRACK, topology_name(Config(HIDDEN_LAYERS=(4,))))) == 0 # other topology
+
+    pop = Population(warm_start=warm_start, config=config)
+    assert np.array_equal(pop.weights[:2], warm_start)
+    assert not np.array_equal(pop.weights[2:4], warm_start) # mutated copies fill the rest
@@ -0,0 +1,53 @@
+"""
+tests for successive halving (screening a candidate pool with short episodes)
+"""
+import numpy as np
+from config import Config
+from environment import Environment
+from agent_state import AgentState
+from evaluation import SuccessiveHalving
+from neural_network import BatchNeuralNetwork, network_layer_sizes, count_weights
+import genome
+
+TRACK = "tracks/track3.json"
+
+
+def episode_fitnesses(env, weights, config, budget):
+    # fitness of full episodes ending at budget frames, like a screening round scores them
+    state = AgentState(len(weights), config.replace(MAX_EPISODE_TICKS=budget, BEST_CUTOFF=False))
+    network = BatchNeuralNetwork(network_layer_sizes(config), weights, config)
+    iterations = 1
+    while state.alive.any():
+        state.step(env, network, iterations)
+        iterations += 1
+    return state.fitness_of(state.distances, budget)
+
+
+def test_budgets_and_pool_size():
+    halving = SuccessiveHalving(None, Config(HALVING_ROUNDS=3, HALVING_ETA=2, HALVING_MIN_TICKS=100, MAX_EPISODE_TICKS=300))
+    assert halving.pool_size(5) == 40
+    assert halving.budgets() == [100, 200, 300] # last round capped at a full episode
+
+
+def test_screen_keeps_top_fraction():
+    config = Config(HALVING_ROUNDS=2, HALVING_ETA=2, HALVING_MIN_TICKS=50)
+    env = Environment(TRACK, config)
+    halving = SuccessiveHalving(env, config)
+    genome.seed(0)
+    weights = genome.random_genomes(halving.pool_size(4), count_weights(network_layer_sizes(config), config.USE_BIASES))
+
+    survivors = halving.screen(weights, 4)
+    assert len(survivors) == 4
+    assert halving.screened == 16
+
+    # first round keeps the best half of all candidates
+    first_budget, last_budget = halving.budgets()
+    fitnesses = episode_fitnesses(env, weights, config, first_budget)
+    promoted = np.argsort(-fitnesses, kind="stable")[:8]
+    assert np.isin(survivors, promoted).all()
+
+    # last round keeps the best half of those, best first (promoted episodes continue up to the longer budget)
+    fitnesses = dict(zip(promoted, episode_fitnesses(env, weights[promoted], config, last_budget)))
+    dropped = [i for i in promoted if i not in survivors]
+    assert min(fitnesses[i] for i in survivors) >= max(fitnesses[i] for i in dropped)
+    assert [fitnesses[i] for i in survivors] == sorted((fitnesses[i] for i in survivors), reverse=True)
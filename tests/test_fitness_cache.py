@@ -0,0 +1,47 @@
+"""
+tests for the fitness cache (conversion to checkpoint arrays and back, stats)
+"""
+import numpy as np
+from agent_state import AgentState, END_REASONS
+from fitness_cache import FitnessCache
+from genome import KEY_SIZE, genome_keys
+
+
+def test_empty_round_trip():
+    cache = FitnessCache()
+    arrays = cache.to_arrays()
+    assert arrays["keys"].shape == (0, KEY_SIZE)
+    assert arrays["positions"].shape == (0, 2)
+
+    restored = FitnessCache()
+    restored.from_arrays(arrays)
+    assert len(restored.results) == 0
+
+
+def test_round_trip():
+    state = AgentState(3)
+    state.alive[:] = False
+    state.end_reasons[:] = END_REASONS.index("collision")
+    state.fitnesses[:] = [0.1, 0.2, 0.3]
+    state.positions[:] = [[1, 2], [3, 4], [5, 6]]
+    keys = genome_keys(np.arange(6.0).reshape(3, 2))
+
+    cache = FitnessCache()
+    cache.store(keys, state, range(3))
+    restored = FitnessCache()
+    restored.from_arrays(cache.to_arrays())
+
+    assert list(restored.results) == keys
+    for key in keys:
+        assert restored.results[key][:4] == cache.results[key][:4]
+        assert np.array_equal(restored.results[key][4], cache.results[key][4])
+
+
+def test_stats():
+    state = AgentState(2)
+    state.alive[:] = False
+    keys = genome_keys(np.arange(4.0).reshape(2, 2))
+    cache = FitnessCache()
+    cache.store(keys[:1], state, [0])
+    cache.restore(keys, AgentState(2))
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1, "hit_rate": 0.5}
@@ -0,0 +1,33 @@
+"""
+tests for the metrics log (part files and resuming)
+"""
+import os
+import numpy as np
+import pytest
+from metrics import MetricsWriter, generation_record, read_metrics
+
+
+def record(generation):
+    values = np.linspace(0, generation, 5)
+    return generation_record(generation, values, values * 100, 0.5, 100, 5, 1.0)
+
+
+@pytest.mark.parametrize("name", ["run.jsonl", "run.csv"])
+def test_resume_replaces_later_generations(tmp_path, name):
+    path = str(tmp_path / name)
+    writer = MetricsWriter(path, max_bytes=300) # a few records per part
+    for generation in range(1, 9):
+        writer.write(record(generation))
+    writer.close()
+    assert os.path.exists(path + ".2")
+
+    # checkpoint of generation 4 (generations 4 to 8 were logged after it was saved)
+    writer = MetricsWriter(path, max_bytes=300, resume_from=4)
+    assert [r["generation"] for r in read_metrics(path)] == [1, 2, 3]
+    for generation in range(4, 7):
+        writer.write(record(generation))
+    writer.close()
+    assert list(read_metrics(path)) == [record(generation) for generation in range(1, 7)]
+
+    MetricsWriter(path).close() # new log replaces all parts
+    assert list(read_metrics(path)) == []
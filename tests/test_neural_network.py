@@ -0,0 +1,28 @@
+"""
+tests for the batched feedforward (compared to one network per agent)
+"""
+import numpy as np
+import pytest
+from config import Config
+from neural_network import NeuralNetwork, BatchNeuralNetwork, network_layer_sizes, count_weights
+
+
+@pytest.mark.parametrize("overrides", [
+    {}, # default topology
+    {"SENSOR_ANGLES": (-90, -30, 0, 30, 90), "HIDDEN_LAYERS": (8, 4), "USE_BIASES": True, "HIDDEN_ACTIVATION": "relu"}
+])
+def test_batch_matches_single(overrides):
+    config = Config(**overrides)
+    layer_sizes = network_layer_sizes(config)
+    rng = np.random.default_rng(0)
+    weights = rng.uniform(-1, 1, (20, count_weights(layer_sizes, config.USE_BIASES)))
+    inputs = rng.uniform(0, 1, (20, layer_sizes[0]))
+
+    networks = [NeuralNetwork(layer_sizes, row, config) for row in weights]
+    batch = BatchNeuralNetwork(layer_sizes, weights, config)
+    expected = np.array([network.feedforward(row) for network, row in zip(networks, inputs)])
+    assert np.allclose(batch.feedforward(inputs), expected, rtol=0, atol=1e-12)
+
+    # live agents only: input rows belong to the networks at indices
+    indices = np.array([3, 7, 8, 19])
+    assert np.allclose(batch.feedforward(inputs[indices], indices), expected[indices], rtol=0, atol=1e-12)
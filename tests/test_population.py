@@ -0,0 +1,13 @@
+"""
+tests for picking the top agents of a population
+"""
+import numpy as np
+from population import top_indices
+
+
+def test_top_indices_match_stable_sort():
+    rng = np.random.default_rng(0)
+    for _ in range(500):
+        values = rng.integers(0, 5, rng.integers(1, 40)).astype(np.float64) # many ties
+        k = int(rng.integers(0, len(values) + 2))
+        assert np.array_equal(top_indices(values, k), np.argsort(-values, kind="stable")[:k])
@@ -0,0 +1,77 @@
+"""
+tests for the sensor ray casters (sphere tracing compared to fixed step ray marching, grid traversal compared to all edges)
+"""
+import numpy as np
+import pytest
+from config import Config
+from environment import Environment
+from settings import WORLD_WIDTH, WORLD_HEIGHT
+
+TRACK = "tracks/track3.json"
+
+
+def cast_both(env, min_wall_dist, max_wall_dist, num_poses=500, seed=0):
+    # sphere traced and marched distances (pixels) of poses whose nearest wall is within the given range
+    rng = np.random.default_rng(seed)
+    xs, ys = np.nonzero((env.distance_field >= min_wall_dist) & (env.distance_field <= max_wall_dist))
+    picked = rng.choice(len(xs), num_poses)
+    positions = np.stack((xs[picked] + 0.5, ys[picked] + 0.5), axis=1)
+    ray_angles = np.radians(rng.uniform(0, 360, num_poses))[:, None] + env.sensor_angles[None, :]
+    dx, dy = np.cos(ray_angles), np.sin(ray_angles)
+
+    sphere = env._cast_rays_sphere(positions, dx, dy)[0] * env.max_sensor_dist
+    march = env._cast_rays_march(positions, dx, dy)[0] * env.max_sensor_dist
+    return sphere, march
+
+
+@pytest.mark.parametrize("max_sensor_dist", [250, 1000])
+@pytest.mark.parametrize("min_wall_dist, max_wall_dist", [(32, 32), (1, 8)]) # open corridors, close to a wall
+def test_sphere_matches_march(max_sensor_dist, min_wall_dist, max_wall_dist):
+    config = Config(RAY_CASTER="sphere", MAX_SENSOR_DIST=max_sensor_dist)
+    env = Environment(TRACK, config)
+    sphere, march = cast_both(env, min_wall_dist, max_wall_dist)
+    difference = sphere - march
+
+    # march samples every RAY_STEP pixels, both round to whole pixels (rare larger differences are thin wall corners)
+    assert np.mean(np.abs(difference) <= config.RAY_STEP + 2) >= 0.98
+    assert np.mean(difference < -20) <= 0.01 # no walls reported where there are none
+
+
+def test_sphere_reaches_max_distance():
+    # rays with nothing in range read the full sensor distance, however many steps they need
+    env = Environment(TRACK, Config(RAY_CASTER="sphere", MAX_SENSOR_DIST=1000, SPHERE_TRACE_STEPS=4))
+    sphere, march = cast_both(env, 32, 32, num_poses=200)
+    assert np.array_equal(sphere == env.max_sensor_dist, march == env.max_sensor_dist)
+
+
+def brute_force_distances(env, ox, oy, dx, dy):
+    # closest intersection of each ray with any edge of the track (no grid), limited by sensor range and world border
+    rel_x = env.edges[None, :, 0] - ox[:, None]
+    rel_y = env.edges[None, :, 1] - oy[:, None]
+    denom = dx[:, None] * env.edges[None, :, 3] - dy[:, None] * env.edges[None, :, 2]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (rel_x * env.edges[None, :, 3] - rel_y * env.edges[None, :, 2]) / denom
+        u = (rel_x * dy[:, None] - rel_y * dx[:, None]) / denom
+        exit_x = np.where(dx > 0, (WORLD_WIDTH - ox) / dx, np.where(dx < 0, -ox / dx, np.inf))
+        exit_y = np.where(dy > 0, (WORLD_HEIGHT - oy) / dy, np.where(dy < 0, -oy / dy, np.inf))
+    hits = np.where((denom != 0) & (t >= 0) & (u >= 0) & (u <= 1), t, np.inf).min(axis=1)
+    return np.minimum(hits, np.minimum(env.max_sensor_dist, np.minimum(exit_x, exit_y)))
+
+
+@pytest.mark.parametrize("max_sensor_dist", [250, 1000])
+def test_analytic_matches_brute_force(max_sensor_dist):
+    env = Environment(TRACK, Config(RAY_CASTER="analytic", MAX_SENSOR_DIST=max_sensor_dist))
+    rng = np.random.default_rng(0)
+    xs, ys = np.nonzero(~env.occupancy) # origins off the track (origins on it read 0 without casting)
+    picked = rng.choice(len(xs), 2000)
+    positions = np.stack((xs[picked] + rng.uniform(0, 1, 2000), ys[picked] + rng.uniform(0, 1, 2000)), axis=1)
+    ray_angles = np.radians(rng.uniform(0, 360, 2000))[:, None] + env.sensor_angles[None, :]
+    dx, dy = np.cos(ray_angles), np.sin(ray_angles)
+
+    analytic = env._cast_rays_analytic(positions, dx, dy)[0].ravel() * env.max_sensor_dist
+    ox, oy = np.repeat(positions[:, 0], dx.shape[1]), np.repeat(positions[:, 1], dx.shape[1])
+    dx, dy = dx.ravel(), dy.ravel()
+    expected = np.concatenate([brute_force_distances(env, ox[i:i + 500], oy[i:i + 500], dx[i:i + 500], dy[i:i + 500])
+                               for i in range(0, len(ox), 500)]) # chunks keep the (rays, edges) arrays small
+    assert np.mean(expected < env.max_sensor_dist) > 0.3 # many rays hit an edge
+    assert np.allclose(analytic, expected, rtol=0, atol=1e-9)
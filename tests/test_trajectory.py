@@ -0,0 +1,77 @@
+"""
+tests for the trajectory recorder (re-simulated trajectories and part files)
+"""
+import os
+import numpy as np
+from config import Config
+from environment import Environment
+from trainer import Trainer, Observer
+from trajectory import TrajectoryRecorder, Run
+from genome import seed
+
+TRACK = "tracks/track3.json"
+
+
+class PoseLog(Observer):
+    # positions of every agent after every tick, like the recorder used to keep them
+    def __init__(self):
+        self.ticks = []
+        self.generations = {}
+
+
+    def on_tick(self, trainer):
+        self.ticks.append(trainer.pop.state.positions.astype(np.float32))
+
+
+    def on_generation(self, trainer):
+        state = trainer.pop.state
+        order = np.argsort(-state.fitnesses, kind="stable")
+        self.generations[trainer.pop.generation] = [np.array(self.ticks)[:state.ticks[i], i] for i in order]
+        self.ticks = []
+
+
+def test_recorder_matches_simulation(tmp_path):
+    config = Config(POP_SIZE=8, MAX_EPISODE_TICKS=400, BEST_CUTOFF=True, STALL_WINDOW=60)
+    seed(0)
+    trainer = Trainer(Environment(TRACK, config), config=config)
+    log = PoseLog()
+    trainer.attach(log)
+    path = str(tmp_path / "run.npz")
+    trainer.attach(TrajectoryRecorder(path, top_k=3, save_interval=2))
+    trainer.run(max_generations=5)
+
+    assert sorted(os.listdir(tmp_path)) == ["run.npz", "run.npz.1", "run.npz.2"] # saved every 2 generations and at the end
+    run = Run(path)
+    assert list(run.generations) == list(log.generations)
+    for generation, expected in log.generations.items():
+        trajectories = run.trajectories(generation)
+        assert len(trajectories) == 3
+        for trajectory, positions in zip(trajectories, expected):
+            assert np.array_equal(trajectory[2], positions)
+
+
+def test_resume_replaces_later_generations(tmp_path):
+    from checkpoint import Checkpointer, load_checkpoint
+    config = Config(POP_SIZE=6, MAX_EPISODE_TICKS=300)
+    env = Environment(TRACK, config)
+    path = str(tmp_path / "run.npz")
+    seed(0)
+    trainer = Trainer(env, config=config)
+    trainer.attach(Checkpointer(str(tmp_path / "checkpoint.npz"), interval=100))
+    trainer.attach(TrajectoryRecorder(path, top_k=2, save_interval=1))
+    trainer.run(max_generations=2) # checkpoint of generation 3
+    trainer.observers.pop(0)
+    trainer.run(max_generations=4) # generations 3 and 4 recorded after the checkpoint
+    expected = Run(path)
+
+    trainer = Trainer(env, config=config)
+    load_checkpoint(str(tmp_path / "checkpoint.npz"), trainer)
+    trainer.attach(TrajectoryRecorder(path, top_k=2, save_interval=1, resume_from=trainer.pop.generation))
+    trainer.run(max_generations=3) # generation 3 again, generation 4 isn't simulated again
+    run = Run(path)
+
+    assert list(run.generations) == [1, 2, 3]
+    for generation in run.generations:
+        for trajectory, other in zip(run.trajectories(generation), expected.trajectories(generation)):
+            assert trajectory[:2] == other[:2]
+            assert all(np.array_equal(a, b) for a, b in zip(trajectory[2:], other[2:]))
@@ -0,0 +1,249 @@
+"""
+benchmark suite for the simulation hot paths (headless, seeded)
+times ray casting, collision (masks and distance field), feedforward, agent update, evolution and full generations
+for every track and population size, writes results as json and compares them to a saved baseline
+
+usage (from repository root):
+    python tools/benchmark.py --output results.json
+    python tools/benchmark.py --save-baseline
+    python tools/benchmark.py --compare
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import numpy as np
+import pygame
+from settings import *
+from environment import Environment
+from agent import Agent
+from genome import Genome, seed as seed_genomes
+from neural_network import NeuralNetwork, BatchNeuralNetwork
+from population import Population
+from sprite_cache import sprite_cache
+from track_compiler import compile_track
+
+DEFAULT_BASELINE = os.path.join(ROOT, "tools", "benchmark_baseline.json")
+
+
+######################################################################################
+# Benchmark cases
+######################################################################################
+
+def random_poses(env, pop_size, seed):
+    # poses spread over the track area that aren't inside a segment
+    rng = np.random.default_rng(seed)
+    positions = []
+    while len(positions) < pop_size:
+        x, y = rng.uniform(0, WORLD_WIDTH), rng.uniform(0, WORLD_HEIGHT)
+        if not env.occupancy[int(x), int(y)]:
+            positions.append((x, y))
+    return np.array(positions), rng.uniform(0, 360, pop_size)
+
+
+def bench_cast_all_rays(env, pop_size, seed):
+    positions, angles = random_poses(env, pop_size, seed)
+    return lambda: env.cast_all_rays(positions, angles)
+
+
+def bench_is_on_track(env, pop_size, seed):
+    positions, angles = random_poses(env, pop_size, seed)
+    cars = []
+    for (x, y), angle in zip(positions, angles):
+        surface, mask = sprite_cache.get(angle, True)
+        cars.append((mask, surface.get_rect(center=(x, y))))
+    return lambda: [env.is_on_track(mask, rect) for mask, rect in cars]
+
+
+def bench_is_on_track_masks(env, pop_size, seed):
+    positions, angles = random_poses(env, pop_size, seed)
+    sprite_cache.mask_offsets() # build outlines before timing
+    return lambda: env.is_on_track_masks(positions, angles)
+
+
+def bench_is_on_track_fast(env, pop_size, seed):
+    if env.distance_field is None:
+        return None # only with distance field
+    positions, angles = random_poses(env, pop_size, seed)
+    return lambda: env.is_on_track_fast(positions, angles)
+
+
+def bench_feedforward(env, pop_size, seed):
+    genomes = [Genome() for _ in range(pop_size)]
+    networks = [NeuralNetwork(genome.layer_sizes, genome.weights) for genome in genomes]
+    inputs = np.random.default_rng(seed).uniform(0, 1, (pop_size, len(SENSOR_ANGLES))).tolist()
+    return lambda: [network.feedforward(x) for network, x in zip(networks, inputs)]
+
+
+def bench_batch_feedforward(env, pop_size, seed):
+    genomes = [Genome() for _ in range(pop_size)]
+    network = BatchNeuralNetwork(genomes[0].layer_sizes, [genome.weights for genome in genomes])
+    inputs = np.random.default_rng(seed).uniform(0, 1, (pop_size, len(SENSOR_ANGLES)))
+    return lambda: network.feedforward(inputs)
+
+
+def bench_agent_update(env, pop_size, seed):
+    agents = [Agent(Genome()) for _ in range(pop_size)]
+    return lambda: [agent.update(env, None, 1) for agent in agents] # one tick of each agent (dead agents return early)
+
+
+def bench_population_step(env, pop_size, seed):
+    pop = Population(pop_size)
+    return lambda: pop.update_agents(env, None, 1) # one vectorized tick (dead agents are skipped)
+
+
+def bench_evolve(env, pop_size, seed):
+    pop = Population(pop_size)
+    pop.state.fitnesses[:] = np.random.default_rng(seed).uniform(0, 1, pop_size)
+    return pop.evolve
+
+
+def bench_generation(env, pop_size, seed):
+    def run():
+        pop = Population(pop_size)
+        iterations = 1
+        while not pop.all_dead():
+            pop.update_agents(env, None, iterations)
+            iterations += 1
+        return iterations
+    return run
+
+
+BENCHMARKS = {
+    "cast_all_rays": bench_cast_all_rays,
+    "is_on_track": bench_is_on_track,
+    "is_on_track_masks": bench_is_on_track_masks,
+    "is_on_track_fast": bench_is_on_track_fast,
+    "feedforward": bench_feedforward,
+    "batch_feedforward": bench_batch_feedforward,
+    "agent_update": bench_agent_update,
+    "population_step": bench_population_step,
+    "evolve": bench_evolve,
+    "generation": bench_generation
+}
+
+
+######################################################################################
+# Running and comparing
+######################################################################################
+
+def time_case(setup, env, pop_size, seed, repeats):
+    # each repeat is set up again with the same seeds, so every run does identical work
+    times = []
+    for _ in range(repeats + 1):
+        random.seed(seed)
+        np.random.seed(seed)
+        seed_genomes(seed)
+        func = setup(env, pop_size, seed)
+        if func is None:
+            return None
+
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times[1:] # first run warms up caches (sprites, segment masks)
+
+
+def run_benchmarks(tracks, pop_sizes, names, repeats, seed):
+    results = []
+    for track in tracks:
+        compile_track(track, distance_field=True) # environment loads a cached distance field, so every run benchmarks is_on_track_fast
+        env = Environment(track)
+        for name in names:
+            for pop_size in pop_sizes:
+                times = time_case(BENCHMARKS[name], env, pop_size, seed, repeats)
+                if times is None:
+                    continue
+
+                result = {
+                    "name": name,
+                    "track": os.path.basename(track),
+                    "pop_size": pop_size,
+                    "median": statistics.median(times),
+                    "min": min(times),
+                    "repeats": repeats
+                }
+                results.append(result)
+                print(f"{result['track']:<12} {name:<18} {pop_size:>6}  median {result['median'] * 1000:10.3f} ms  min {result['min'] * 1000:10.3f} ms")
+    return results
+
+
+def compare(results, baseline, threshold):
+    # ratio of median times to baseline, returns number of regressions
+    baseline_times = {(r["name"], r["track"], r["pop_size"]): r["median"] for r in baseline["results"]}
+    regressions = 0
+
+    print(f"\n{'track':<12} {'benchmark':<18} {'pop':>6} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}")
+    for result in results:
+        key = (result["name"], result["track"], result["pop_size"])
+        if key not in baseline_times:
+            continue
+        ratio = result["median"] / max(baseline_times[key], 1e-12)
+        flag = ""
+        if ratio > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{key[1]:<12} {key[0]:<18} {key[2]:>6} {baseline_times[key] * 1000:12.3f} {result['median'] * 1000:12.3f} {ratio:7.2f}{flag}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark the simulation hot paths")
+    parser.add_argument("--tracks", nargs="+", default=sorted(glob.glob(os.path.join("tracks", "*.json"))), help="track files")
+    parser.add_argument("--pop-sizes", nargs="+", type=int, default=[10, 100, 1000], help="population sizes")
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per case")
+    parser.add_argument("--seed", type=int, default=0, help="seed for random, numpy and poses")
+    parser.add_argument("--output", help="write results to json file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline json file")
+    parser.add_argument("--save-baseline", action="store_true", help="save results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="compare results to baseline (exit code 1 on regressions)")
+    parser.add_argument("--threshold", type=float, default=1.2, help="ratio to baseline counted as regression")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare: # load before running, so a missing baseline doesn't waste a whole run
+        try:
+            with open(args.baseline, "r") as file:
+                baseline = json.load(file)
+        except FileNotFoundError:
+            parser.error(f"no baseline at {args.baseline}, save one with --save-baseline first")
+        except (OSError, json.JSONDecodeError) as e:
+            parser.error(f"can't read baseline {args.baseline}: {e}")
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "settings": {"RAY_CASTER": RAY_CASTER, "USE_DISTANCE_FIELD": USE_DISTANCE_FIELD, "SENSOR_ANGLES": list(SENSOR_ANGLES)}
+        },
+        "results": run_benchmarks(args.tracks, args.pop_sizes, args.benchmarks, args.repeats, args.seed)
+    }
+
+    for path in [args.output, args.baseline if args.save_baseline else None]:
+        if path:
+            with open(path, "w") as file:
+                json.dump(results, file, indent=2)
+            print(f"Saved results to {path}")
+
+    if baseline is not None:
+        regressions = compare(results["results"], baseline, args.threshold)
+        print(f"{regressions} regressions (threshold {args.threshold:.2f}x)")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()